@@ -1,18 +1,26 @@
 import sys
-from PySide6.QtWidgets import QApplication
-from src.views.main_window import MainWindow
+from src import startup_timing
 
 def main():
+    from PySide6.QtWidgets import QApplication
+    startup_timing.mark("导入 PySide6")
+    
     app = QApplication(sys.argv)
+    startup_timing.mark("创建 QApplication")
     
     # 设置应用程序样式
     app.setStyle('Fusion')
     
+    from src.views.main_window import MainWindow
+    startup_timing.mark("导入主窗口")
+    
     # 创建并显示主窗口
     window = MainWindow()
+    startup_timing.mark("构造主窗口")
+    startup_timing.report_after_first_paint(window)
     window.show()
     
     sys.exit(app.exec())
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,316 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .models.password_generator import PasswordGenerator
+from .models.password_sink import write_to_file, write_to_stdout
+
+# --record 时每积累多少条写入一次历史记录
+RECORD_CHUNK_SIZE = 5000
+
+# 命令行入口只依赖 src.models，不导入 Qt：
+#     python -m src.cli generate --length 24 --count 1000 --format jsonl
+
+
+def _parse_min_counts(values: Optional[List[str]]) -> Optional[Dict[str, int]]:
+    """解析 --min digits=2 形式的参数"""
+    if not values:
+        return None
+    min_counts = {}
+    for value in values:
+        name, sep, number = value.partition('=')
+        if not sep or not number.isdigit():
+            raise argparse.ArgumentTypeError(f"无效的最少数量：{value}，应为 类型=数量")
+        min_counts[name] = int(number)
+    return min_counts
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description="密码生成器命令行工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help="生成密码")
+    generate.add_argument('--length', type=int, default=16, help="密码长度（12-64，默认16）")
+    generate.add_argument('--count', type=int, default=1, help="生成数量（默认1）")
+    generate.add_argument('--no-uppercase', action='store_true', help="不使用大写字母")
+    generate.add_argument('--no-lowercase', action='store_true', help="不使用小写字母")
+    generate.add_argument('--no-digits', action='store_true', help="不使用数字")
+    generate.add_argument('--no-special', action='store_true', help="不使用特殊字符")
+    generate.add_argument('--min', action='append', metavar='TYPE=N',
+                          help="某种字符类型的最少数量，TYPE 为 uppercase/lowercase/digits/special，可重复")
+    generate.add_argument('--format', choices=['text', 'jsonl', 'csv'], default='text', help="输出格式")
+    generate.add_argument('--score', action='store_true', help="输出 zxcvbn 强度评分（0-4）")
+    generate.add_argument('--entropy', action='store_true', help="输出熵值")
+    generate.add_argument('--record', action='store_true', help="写入历史记录")
+    generate.add_argument('--output', '-o', help="输出文件（默认标准输出）")
+    generate.add_argument('--template', help="密码模板，如 'Aaaa-9999-!!'（A 大写、a 小写、9 数字、! 特殊字符、* 任意）")
+    generate.add_argument('--symbols', help="可用的特殊字符（默认 !@#$%%^&*）")
+    generate.add_argument('--exclude', help="排除的字符")
+    generate.add_argument('--exclude-ambiguous', action='store_true', help="排除容易混淆的字符（0Oo1lI|）")
+    generate.add_argument('--policy', metavar='NAME', help="使用策略文件中的命名策略（忽略其他策略参数）")
+    generate.add_argument('--policy-file', metavar='FILE',
+                          help="JSON 策略文件（默认 ~/.password_generator/policies.json）")
+    generate.add_argument('--breach-corpus', metavar='FILE',
+                          help="按哈希排序的泄露密码语料库（SHA-1 或 NTLM），出现在其中的密码会被重新生成")
+
+    passphrase = subparsers.add_parser('passphrase', help="生成 Diceware 口令短语")
+    passphrase.add_argument('--wordlist', required=True,
+                            help="词表文件（每行一个单词或 EFF 格式，首次使用时编译缓存；也可以是已编译的 .pgw 文件）")
+    passphrase.add_argument('--words', type=int, default=6, help="单词数（3-20，默认6）")
+    passphrase.add_argument('--count', type=int, default=1, help="生成数量（默认1）")
+    passphrase.add_argument('--separator', default='-', help="单词分隔符（默认 -）")
+    passphrase.add_argument('--capitalize', choices=['none', 'first', 'random'], default='none',
+                            help="首字母大写方式：不变、全部大写或随机")
+    passphrase.add_argument('--digits', type=int, default=0, help="在随机一个单词后追加的数字位数（默认0）")
+    passphrase.add_argument('--format', choices=['text', 'jsonl', 'csv'], default='text', help="输出格式")
+    passphrase.add_argument('--entropy', action='store_true', help="输出熵值")
+    passphrase.add_argument('--output', '-o', help="输出文件（默认标准输出）")
+
+    wordlist_compile = subparsers.add_parser('wordlist-compile', help="把文本词表编译为可直接映射的 .pgw 文件")
+    wordlist_compile.add_argument('source', help="文本词表")
+    wordlist_compile.add_argument('output', help="输出的 .pgw 文件")
+
+    breach_check = subparsers.add_parser('breach-check', help="检查标准输入中的每行密码是否已泄露")
+    breach_check.add_argument('corpus', help="按哈希排序的泄露密码语料库")
+    breach_check.add_argument('--hash', choices=['sha1', 'ntlm'], help="语料库的哈希类型（默认自动识别）")
+    breach_check.add_argument('--batch-size', type=int, default=100000, help="每批排序后查询的密码数")
+
+    breach_index = subparsers.add_parser('breach-index', help="为泄露密码语料库生成前缀索引")
+    breach_index.add_argument('corpus', help="按哈希排序的泄露密码语料库")
+    breach_index.add_argument('--hash', choices=['sha1', 'ntlm'], help="语料库的哈希类型（默认自动识别）")
+    breach_index.add_argument('--bits', type=int, default=20, help="前缀位数（4 的倍数，默认 20）")
+
+    migrate = subparsers.add_parser('migrate-ciphertext',
+                                    help="把旧格式的密文转换为紧凑的二进制格式（逐行读取标准输入，或转换保管库）")
+    migrate.add_argument('--vault', metavar='FILE', help="重新加密保管库中的旧格式记录（需要输入主密码）")
+    return parser
+
+
+def _csv_field(value: str) -> str:
+    # 密码字符集中不含逗号、引号和换行，通常无需转义；口令短语的分隔符可能是逗号
+    if ',' in value or '"' in value or '\n' in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _build_policy(args: argparse.Namespace):
+    """根据 --policy 或模板、字符集参数创建 PasswordPolicy，都未指定时返回 None"""
+    from .models.policy import DEFAULT_SYMBOLS, PasswordPolicy, load_policies
+    if args.policy:
+        path = args.policy_file or Path.home() / '.password_generator' / 'policies.json'
+        policies = load_policies(path)
+        if args.policy not in policies:
+            raise ValueError(f"未找到密码策略：{args.policy}")
+        return policies[args.policy]
+    if args.template is None and args.symbols is None and not args.exclude and not args.exclude_ambiguous:
+        return None
+    selected = (
+        ('uppercase', not args.no_uppercase),
+        ('lowercase', not args.no_lowercase),
+        ('digits', not args.no_digits),
+        ('special', not args.no_special),
+    )
+    return PasswordPolicy(
+        length=args.length,
+        classes=[name for name, use in selected if use],
+        symbols=DEFAULT_SYMBOLS if args.symbols is None else args.symbols,
+        min_counts=_parse_min_counts(args.min),
+        exclude=args.exclude or '',
+        exclude_ambiguous=args.exclude_ambiguous,
+        template=args.template,
+    )
+
+
+def _format_lines(rows: Iterator[dict], fmt: str, fields: List[str]) -> Iterator[str]:
+    """把每条结果格式化为一行"""
+    if fmt == 'jsonl':
+        import json
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False)
+    elif fmt == 'csv':
+        yield ','.join(fields)
+        for row in rows:
+            yield ','.join(_csv_field(str(row[field])) for field in fields)
+    else:
+        for row in rows:
+            yield '\t'.join(str(row[field]) for field in fields)
+
+
+def _generate(args: argparse.Namespace) -> int:
+    generator = PasswordGenerator()
+    policy = dict(
+        use_uppercase=not args.no_uppercase,
+        use_lowercase=not args.no_lowercase,
+        use_digits=not args.no_digits,
+        use_special=not args.no_special,
+        min_counts=_parse_min_counts(args.min),
+    )
+    password_policy = _build_policy(args)
+    if password_policy is not None:
+        policy = dict(policy=password_policy)
+    passwords = generator.iter_passwords(args.count, length=args.length, with_entropy=True, **policy)
+
+    history_manager = None
+    if args.record:
+        from .models.encryption_manager import EncryptionManager
+        from .models.history_manager import HistoryManager
+        history_manager = HistoryManager(write_behind=True, encryption_manager=EncryptionManager())
+        # 记录到历史时同时保证不会生成历史中已有的密码（迭代开始后才会用到）
+        generator.reuse_checker = history_manager.find_reused
+
+    breach_checker = None
+    if args.breach_corpus:
+        from .models.breach_checker import BreachChecker
+        breach_checker = BreachChecker(args.breach_corpus)
+        generator.breach_checker = breach_checker.find_breached
+
+    fields = ['password']
+    if args.score:
+        fields.append('score')
+    if args.entropy:
+        fields.append('entropy')
+
+    def rows() -> Iterator[dict]:
+        pending = []
+        for password, entropy in passwords:
+            row = {'password': password}
+            score = None
+            if args.score or history_manager:
+                score = generator.estimate_strength(password, generated=True, **policy)['score']
+            if args.score:
+                row['score'] = score
+            if args.entropy:
+                row['entropy'] = entropy
+            if history_manager:
+                pending.append((password, len(password), score * 25, entropy))
+                if len(pending) >= RECORD_CHUNK_SIZE:
+                    history_manager.queue_records(pending)
+                    pending = []
+            yield row
+        if pending:
+            history_manager.queue_records(pending)
+
+    lines = _format_lines(rows(), args.format, fields)
+    try:
+        if args.output:
+            write_to_file(lines, args.output)
+        else:
+            write_to_stdout(lines)
+    finally:
+        if history_manager:
+            # 等待后台写入线程写完全部记录
+            history_manager.close()
+        if breach_checker:
+            breach_checker.close()
+    return 0
+
+
+def _passphrase(args: argparse.Namespace) -> int:
+    generator = PasswordGenerator()
+    phrases = generator.iter_passphrases(
+        args.wordlist, args.count,
+        words=args.words,
+        separator=args.separator,
+        capitalize=args.capitalize,
+        digits=args.digits,
+        with_entropy=True,
+    )
+    fields = ['passphrase']
+    if args.entropy:
+        fields.append('entropy')
+    rows = ({'passphrase': phrase, 'entropy': entropy} if args.entropy else {'passphrase': phrase}
+            for phrase, entropy in phrases)
+    lines = _format_lines(rows, args.format, fields)
+    if args.output:
+        write_to_file(lines, args.output)
+    else:
+        write_to_stdout(lines)
+    return 0
+
+
+def _wordlist_compile(args: argparse.Namespace) -> int:
+    from .models.wordlist import compile_wordlist, parse_wordlist
+    with open(args.source, encoding='utf-8') as f:
+        words = parse_wordlist(f)
+    compile_wordlist(words, args.output)
+    print(f"已编译 {len(words)} 个单词：{args.output}", file=sys.stderr)
+    return 0
+
+
+def _breach_check(args: argparse.Namespace) -> int:
+    """逐批读取标准输入，输出 密码<TAB>出现次数"""
+    from itertools import islice
+    from .models.breach_checker import BreachChecker
+    if args.batch_size < 1:
+        raise ValueError("批大小必须大于0")
+    passwords = (line.rstrip('\r\n') for line in sys.stdin)
+
+    def lines() -> Iterator[str]:
+        while True:
+            batch = list(islice(passwords, args.batch_size))
+            if not batch:
+                return
+            for password, count in zip(batch, checker.breach_counts(batch)):
+                yield f"{password}\t{count}"
+
+    with BreachChecker(args.corpus, args.hash) as checker:
+        write_to_stdout(lines())
+    return 0
+
+
+def _breach_index(args: argparse.Namespace) -> int:
+    from .models.breach_checker import BreachChecker
+    with BreachChecker(args.corpus, args.hash) as checker:
+        index_path = checker.build_index(bits=args.bits)
+    print(f"已生成前缀索引：{index_path}", file=sys.stderr)
+    return 0
+
+
+def _migrate_ciphertext(args: argparse.Namespace) -> int:
+    """默认逐行转换标准输入中 encrypt_password 的结果，已是新格式的原样输出"""
+    from .models.encryption_manager import EncryptionManager
+    manager = EncryptionManager()
+    if args.vault:
+        from getpass import getpass
+        with manager.open_vault(getpass("主密码："), args.vault, create=False) as vault:
+            vault.compact(migrate=True)
+            print(f"已迁移保管库：{args.vault}（{len(vault)} 条记录）", file=sys.stderr)
+        return 0
+    texts = (line.strip() for line in sys.stdin)
+    write_to_stdout(manager.codec.migrate_text(text for text in texts if text))
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    try:
+        if args.command == 'generate':
+            return _generate(args)
+        if args.command == 'passphrase':
+            return _passphrase(args)
+        if args.command == 'wordlist-compile':
+            return _wordlist_compile(args)
+        if args.command == 'breach-check':
+            return _breach_check(args)
+        if args.command == 'breach-index':
+            return _breach_index(args)
+        if args.command == 'migrate-ciphertext':
+            return _migrate_ciphertext(args)
+    except (ValueError, argparse.ArgumentTypeError) as e:
+        print(f"错误：{str(e)}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # 下游（如 head）提前关闭了管道，避免退出时再次刷新标准输出报错
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except OSError as e:
+        print(f"错误：{str(e)}", file=sys.stderr)
+        return 2
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,291 @@
+import hashlib
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# 前缀索引文件：魔数、版本、前缀位数、语料库文件大小，之后是 2^bits + 1 个偏移量
+_INDEX_HEADER = struct.Struct('<4sBBxxQ')
+_INDEX_MAGIC = b'PGPI'
+_INDEX_VERSION = 1
+DEFAULT_INDEX_BITS = 20
+# 剩余范围不超过该字节数时不再二分，直接在映射中顺序查找
+SCAN_LIMIT = 64 * 1024
+
+# 语料库中每行开头的十六进制哈希长度
+_HEX_LENGTHS = {'sha1': 40, 'ntlm': 32}
+
+
+def _left_rotate(value: int, shift: int) -> int:
+    value &= 0xFFFFFFFF
+    return ((value << shift) | (value >> (32 - shift))) & 0xFFFFFFFF
+
+
+def _md4(data: bytes) -> bytes:
+    """纯 Python 的 MD4（RFC 1320），用于 OpenSSL 3 默认不再提供 MD4 的环境"""
+    message = bytearray(data)
+    bit_length = len(data) * 8
+    message.append(0x80)
+    message.extend(bytes((56 - len(message) % 64) % 64))
+    message.extend(struct.pack('<Q', bit_length & 0xFFFFFFFFFFFFFFFF))
+
+    a, b, c, d = 0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476
+    for offset in range(0, len(message), 64):
+        x = struct.unpack_from('<16I', message, offset)
+        aa, bb, cc, dd = a, b, c, d
+        # 第一轮
+        for i in range(16):
+            k = i
+            f = (b & c) | (~b & d)
+            a, b, c, d = d, _left_rotate(a + f + x[k], (3, 7, 11, 19)[i % 4]), b, c
+        # 第二轮
+        for i in range(16):
+            k = (i % 4) * 4 + i // 4
+            g = (b & c) | (b & d) | (c & d)
+            a, b, c, d = d, _left_rotate(a + g + x[k] + 0x5A827999, (3, 5, 9, 13)[i % 4]), b, c
+        # 第三轮
+        for i in range(16):
+            k = (0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15)[i]
+            h = b ^ c ^ d
+            a, b, c, d = d, _left_rotate(a + h + x[k] + 0x6ED9EBA1, (3, 9, 11, 15)[i % 4]), b, c
+        a = (a + aa) & 0xFFFFFFFF
+        b = (b + bb) & 0xFFFFFFFF
+        c = (c + cc) & 0xFFFFFFFF
+        d = (d + dd) & 0xFFFFFFFF
+    return struct.pack('<4I', a, b, c, d)
+
+
+def _md4_digest(data: bytes) -> bytes:
+    try:
+        return hashlib.new('md4', data).digest()
+    except ValueError:
+        return _md4(data)
+
+
+def sha1_hex(password: str) -> bytes:
+    """SHA-1，大写十六进制（与 Have I Been Pwned 语料库一致）"""
+    return hashlib.sha1(password.encode('utf-8')).hexdigest().upper().encode('ascii')
+
+
+def ntlm_hex(password: str) -> bytes:
+    """NTLM 哈希：UTF-16LE 编码后的 MD4，大写十六进制"""
+    return _md4_digest(password.encode('utf-16-le')).hex().upper().encode('ascii')
+
+
+_HASHERS: Dict[str, Callable[[str], bytes]] = {'sha1': sha1_hex, 'ntlm': ntlm_hex}
+
+
+class BreachChecker:
+    """离线泄露密码检查
+
+    语料库为按哈希排序的文本文件，每行为“十六进制哈希:出现次数”或只有哈希
+    （如 Have I Been Pwned 的 SHA-1 或 NTLM 下载，按哈希排序的版本）。
+    文件通过 mmap 只读映射，在其中二分查找，不会整体读入内存，也不需要联网。
+    可选的前缀索引记录每个哈希前缀所在的字节范围（见 build_index），
+    查询时直接定位到一个很小的范围，通常只需一次磁盘读取。
+    """
+
+    def __init__(self,
+                 corpus_path: Union[str, Path],
+                 hash_type: Optional[str] = None,
+                 index_path: Optional[Union[str, Path]] = None):
+        self.corpus_path = Path(corpus_path)
+        self._mm: Optional[mmap.mmap] = None
+        self._index = None
+        self._index_mm: Optional[mmap.mmap] = None
+        self._index_bits = 0
+        with open(self.corpus_path, 'rb') as f:
+            self._size = f.seek(0, 2)
+            if self._size == 0:
+                raise ValueError("泄露密码语料库为空")
+            # 映射建立后即可关闭文件
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if hash_type is None:
+            # 按第一行哈希的长度识别类型
+            end = self._mm.find(b'\n')
+            first_line = self._mm[:end if end >= 0 else self._size]
+            width = len(first_line.split(b':', 1)[0].strip())
+            hash_type = next((name for name, length in _HEX_LENGTHS.items() if length == width), None)
+            if hash_type is None:
+                self.close()
+                raise ValueError("无法识别语料库的哈希类型")
+        if hash_type not in _HASHERS:
+            self.close()
+            raise ValueError(f"不支持的哈希类型：{hash_type}")
+        self.hash_type = hash_type
+        self._hash = _HASHERS[hash_type]
+
+        # 前缀索引：未指定时使用语料库旁边的 .idx 文件（如果存在且与语料库匹配）
+        if index_path is not None:
+            self._load_index(Path(index_path))
+        else:
+            default_path = self.corpus_path.with_name(self.corpus_path.name + '.idx')
+            if default_path.exists():
+                try:
+                    self._load_index(default_path)
+                except ValueError:
+                    # 过期的索引不影响查询，只是退回到整个文件的二分查找
+                    pass
+
+    def close(self):
+        self._close_index()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _close_index(self):
+        if isinstance(self._index, memoryview):
+            self._index.release()
+        if self._index_mm is not None:
+            self._index_mm.close()
+        self._index = None
+        self._index_mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _lower_bound(self, key: bytes, lo: int, hi: int) -> int:
+        """[lo, hi) 范围内第一个开头不小于 key 的行的起始位置（lo、hi 均为行首）"""
+        mm = self._mm
+        width = len(key)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            newline = mm.rfind(b'\n', lo, mid)
+            start = lo if newline < 0 else newline + 1
+            if mm[start:start + width] < key:
+                end = mm.find(b'\n', start, hi)
+                lo = hi if end < 0 else end + 1
+            else:
+                hi = start
+        return lo
+
+    def _find(self, key: bytes, lo: int, hi: int) -> Tuple[int, int]:
+        """在 [lo, hi) 中查找 key，返回 (所在行的起始位置或 -1, 缩小后的范围起点)"""
+        mm = self._mm
+        width = len(key)
+        while hi - lo > SCAN_LIMIT:
+            mid = (lo + hi) // 2
+            newline = mm.rfind(b'\n', lo, mid)
+            start = lo if newline < 0 else newline + 1
+            line_key = mm[start:start + width]
+            if line_key < key:
+                end = mm.find(b'\n', start, hi)
+                lo = hi if end < 0 else end + 1
+            elif line_key > key:
+                hi = start
+            else:
+                return start, start
+        # 哈希由连续的十六进制字符组成，行中的冒号和换行把它与次数隔开，
+        # 因此完整哈希的匹配只可能出现在行首
+        return mm.find(key, lo, hi), lo
+    
+    def _range(self, key: bytes) -> Tuple[int, int]:
+        """key 可能所在的字节范围，有前缀索引时只是索引中的一个小区间"""
+        if self._index is None:
+            return 0, self._size
+        prefix = int(key[:self._index_bits // 4], 16)
+        return self._index[prefix], self._index[prefix + 1]
+
+    def _count_at(self, key: bytes, position: int) -> int:
+        """position 处为 key 所在行时返回出现次数（没有次数列时为 1）"""
+        mm = self._mm
+        width = len(key)
+        end = mm.find(b'\n', position)
+        rest = mm[position + width:end if end >= 0 else self._size].strip()
+        # 行尾可能是 \r\n；只有哈希没有次数时按 1 次计
+        return int(rest[1:]) if rest[1:].isdigit() else 1
+
+    def breach_count(self, password: str) -> int:
+        """密码在语料库中的出现次数，未出现时为 0"""
+        key = self._hash(password)
+        position, _ = self._find(key, *self._range(key))
+        return self._count_at(key, position) if position >= 0 else 0
+
+    def is_breached(self, password: str) -> bool:
+        return self.breach_count(password) > 0
+
+    def breach_counts(self, passwords: Sequence[str]) -> List[int]:
+        """批量查询出现次数，结果与输入顺序一致
+
+        先按哈希排序，再从前往后依次查找：每次查找都从上一个结果的位置开始，
+        整个文件只顺序扫过一遍，相邻的查询落在同一批页面中。
+        """
+        keys = [self._hash(password) for password in passwords]
+        counts = [0] * len(keys)
+        start = 0
+        for i in sorted(range(len(keys)), key=keys.__getitem__):
+            key = keys[i]
+            lo, hi = self._range(key)
+            # 查询已排序，上一次查找缩小到的位置之前不可能再命中
+            position, start = self._find(key, max(lo, start), hi)
+            if position >= 0:
+                counts[i] = self._count_at(key, position)
+        return counts
+
+    def find_breached(self, passwords: Sequence[str]) -> List[bool]:
+        """每个密码是否出现在语料库中，可作为 PasswordGenerator 的 breach_checker"""
+        return [count > 0 for count in self.breach_counts(passwords)]
+
+    def build_index(self,
+                    index_path: Optional[Union[str, Path]] = None,
+                    bits: int = DEFAULT_INDEX_BITS) -> Path:
+        """生成前缀索引文件并立即启用，返回索引文件路径
+
+        索引为 2^bits + 1 个 8 字节偏移量（bits=20 时 8 MB），每个前缀的边界
+        通过一次二分查找得到，不需要逐行读取语料库。
+        """
+        if bits % 4 or not 4 <= bits <= 28:
+            raise ValueError("前缀位数必须是4的倍数，且在4-28之间")
+        if index_path is None:
+            index_path = self.corpus_path.with_name(self.corpus_path.name + '.idx')
+        index_path = Path(index_path)
+        digits = bits // 4
+        temp_path = index_path.with_name(index_path.name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, _INDEX_VERSION, bits, self._size))
+            offsets = []
+            position = 0
+            for prefix in range(1 << bits):
+                key = format(prefix, f'0{digits}X').encode('ascii')
+                position = self._lower_bound(key, position, self._size)
+                offsets.append(position)
+                if len(offsets) >= 65536:
+                    f.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+                    offsets = []
+            offsets.append(self._size)
+            f.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+        temp_path.replace(index_path)
+        self._load_index(index_path)
+        return index_path
+
+    def _load_index(self, index_path: Path):
+        with open(index_path, 'rb') as f:
+            header = f.read(_INDEX_HEADER.size)
+            if len(header) < _INDEX_HEADER.size:
+                raise ValueError("前缀索引文件无效")
+            magic, version, bits, corpus_size = _INDEX_HEADER.unpack(header)
+            if magic != _INDEX_MAGIC or version != _INDEX_VERSION:
+                raise ValueError("前缀索引文件无效")
+            if corpus_size != self._size:
+                raise ValueError("前缀索引与语料库不匹配，请重新生成")
+            index_mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(index_mm) != _INDEX_HEADER.size + ((1 << bits) + 1) * 8:
+            index_mm.close()
+            raise ValueError("前缀索引文件无效")
+        self._close_index()
+        if sys.byteorder == 'little':
+            # 通过 memoryview 直接按 8 字节整数读取映射的文件，不复制到内存
+            self._index_mm = index_mm
+            self._index = memoryview(index_mm)[_INDEX_HEADER.size:].cast('Q')
+        else:
+            offsets = array('Q', index_mm[_INDEX_HEADER.size:])
+            offsets.byteswap()
+            index_mm.close()
+            self._index = offsets
+        self._index_bits = bits
@@ -0,0 +1,96 @@
+import os
+from base64 import b64decode, urlsafe_b64decode, urlsafe_b64encode
+from typing import Iterable, Iterator
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+# 二进制密文的第一个字节为格式版本：AES-256-GCM，之后是 12 字节随机数和带 16 字节标签的密文
+VERSION_AESGCM = 0x01
+# Fernet 令牌解码为二进制后的第一个字节
+VERSION_FERNET = 0x80
+NONCE_SIZE = 12
+_AESGCM_PREFIX = bytes((VERSION_AESGCM,))
+# Fernet 令牌的文本形式（URL 安全 base64）以 'gAAAAA' 开头；
+# 旧版 encrypt_password 又做了一次 base64，结果以 'Z0FBQUFB' 开头
+_FERNET_TEXT_PREFIX = b'gAAAAA'
+_LEGACY_TEXT_PREFIX = b'Z0FBQUFB'
+
+
+class CiphertextCodec:
+    """紧凑的二进制密文格式
+
+    新密文为 版本字节 + AES-GCM 的随机数和密文，16 位密码约 45 字节，
+    旧格式（两层 base64 的 Fernet 令牌）约 164 字节，加解密也不再需要 base64。
+    AES 密钥由 Fernet 密钥经 HKDF 派生，不需要额外保存密钥。
+    解密时按开头识别格式，二进制 Fernet 令牌、文本 Fernet 令牌和旧格式都能直接读取。
+    """
+
+    def __init__(self, fernet_key: bytes):
+        self.fernet = Fernet(fernet_key)
+        self._key_material = urlsafe_b64decode(fernet_key)
+        self._aead = AESGCM(self.derive_key(b'aes-gcm'))
+
+    def derive_key(self, purpose: bytes) -> bytes:
+        """由同一密钥经 HKDF 派生用于其他用途的 32 字节子密钥，不同 purpose 的结果互不相关"""
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b'password-generator ' + purpose,
+        ).derive(self._key_material)
+
+    def encrypt(self, data: bytes) -> bytes:
+        nonce = os.urandom(NONCE_SIZE)
+        return _AESGCM_PREFIX + nonce + self._aead.encrypt(nonce, data, None)
+
+    def decrypt(self, blob: bytes) -> bytes:
+        try:
+            version = blob[0] if blob else None
+            if version == VERSION_AESGCM:
+                return self._aead.decrypt(blob[1:1 + NONCE_SIZE], blob[1 + NONCE_SIZE:], None)
+            if version == VERSION_FERNET:
+                return self.fernet.decrypt(urlsafe_b64encode(blob))
+            if blob.startswith(_FERNET_TEXT_PREFIX):
+                return self.fernet.decrypt(blob)
+            if blob.startswith(_LEGACY_TEXT_PREFIX):
+                return self.fernet.decrypt(b64decode(blob))
+        except (InvalidTag, InvalidToken, ValueError):
+            raise ValueError("密文无效或密钥不匹配")
+        raise ValueError("未知的密文格式")
+
+    @staticmethod
+    def is_current(blob: bytes) -> bool:
+        """是否已经是当前的二进制格式"""
+        return blob[:1] == _AESGCM_PREFIX
+
+    def encrypt_text(self, data: bytes) -> str:
+        """需要文本时（如 TEXT 列、剪贴板）只做一层 URL 安全 base64"""
+        return urlsafe_b64encode(self.encrypt(data)).decode('ascii')
+
+    @staticmethod
+    def _text_blob(text: str) -> bytes:
+        try:
+            blob = text.encode('ascii')
+            if blob.startswith(_FERNET_TEXT_PREFIX) or blob.startswith(_LEGACY_TEXT_PREFIX):
+                return blob
+            return urlsafe_b64decode(blob)
+        except ValueError:
+            raise ValueError("密文无效或密钥不匹配")
+
+    def decrypt_text(self, text: str) -> bytes:
+        return self.decrypt(self._text_blob(text))
+
+    def migrate(self, blobs: Iterable[bytes]) -> Iterator[bytes]:
+        """逐条把旧格式密文重新加密为当前格式，已是当前格式的原样返回"""
+        for blob in blobs:
+            yield blob if self.is_current(blob) else self.encrypt(self.decrypt(blob))
+
+    def migrate_text(self, texts: Iterable[str]) -> Iterator[str]:
+        """文本形式的 migrate"""
+        for text in texts:
+            blob = self._text_blob(text)
+            yield text if self.is_current(blob) else self.encrypt_text(self.decrypt(blob))
@@ -1,24 +1,88 @@
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from base64 import b64encode, b64decode
+from base64 import urlsafe_b64encode
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import hashlib
+import json
 import os
+import threading
+import time
+
+from .codec import CiphertextCodec
+from .kdf import (DEFAULT_TARGET_SECONDS, SALT_SIZE, KdfParams, calibrate, derive_key,
+                  pack_header, unpack_header, validate_params)
+from .vault import Vault
+
+# 派生密钥缓存的最大条数和有效期（秒）
+KEY_CACHE_SIZE = 64
+KEY_CACHE_TTL = 300
+# 批量加解密超过该条数时才分发到线程池
+PARALLEL_CRYPTO_THRESHOLD = 4096
+# 线程池中每个任务处理的条数
+CRYPTO_CHUNK_SIZE = 1024
+
+
+def _apply_chunk(func: Callable, items: List, start: int, prefix: str) -> Tuple[List, Dict[int, str]]:
+    """对一段输入逐条调用 func，失败的条目结果为 None，错误信息按全局下标记录"""
+    results = []
+    errors: Dict[int, str] = {}
+    for i, item in enumerate(items, start):
+        try:
+            results.append(func(item))
+        except Exception as e:
+            results.append(None)
+            errors[i] = f"{prefix}{str(e)}"
+    return results, errors
+
+
+def _apply_many(func: Callable,
+                items: Iterable,
+                workers: Optional[int],
+                prefix: str) -> Tuple[List, Dict[int, str]]:
+    items = list(items)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(items) < PARALLEL_CRYPTO_THRESHOLD:
+        return _apply_chunk(func, items, 0, prefix)
+    # cryptography 的加解密在 Rust 中执行时会释放 GIL，线程即可利用多个核心
+    from concurrent.futures import ThreadPoolExecutor
+    starts = range(0, len(items), CRYPTO_CHUNK_SIZE)
+    results: List = []
+    errors: Dict[int, str] = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crypto') as executor:
+        chunks = executor.map(lambda start: _apply_chunk(func, items[start:start + CRYPTO_CHUNK_SIZE], start, prefix),
+                              starts)
+        for chunk_results, chunk_errors in chunks:
+            results.extend(chunk_results)
+            errors.update(chunk_errors)
+    return results, errors
 
 class EncryptionManager:
-    def __init__(self):
+    def __init__(self, kdf_params: Optional[KdfParams] = None):
         # 确保数据目录存在
         self.data_dir = Path.home() / '.password_generator'
         self.data_dir.mkdir(exist_ok=True)
         
         # 密钥文件路径
         self.key_file = self.data_dir / 'master.key'
+        # 校准后的 KDF 参数
+        self.kdf_file = self.data_dir / 'kdf.json'
+        # 默认的保管库文件
+        self.vault_file = self.data_dir / 'vault.pgv'
         
         # 初始化或加载密钥
         self._init_key()
         
+        # 主密码派生密钥的缓存，只保存在内存中：
+        # (盐值, KDF 参数, 主密码的带密钥摘要) -> (CiphertextCodec, 过期时间)
+        # 摘要的密钥每个进程随机生成，缓存中不保存主密码本身
+        if kdf_params is not None:
+            validate_params(kdf_params)
+        self._kdf_params = kdf_params
+        self._cache_secret = os.urandom(32)
+        self._key_cache: 'OrderedDict[Tuple, Tuple[CiphertextCodec, float]]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
     def _init_key(self):
         """初始化或加载主密钥"""
         if not self.key_file.exists():
@@ -33,23 +97,145 @@ class EncryptionManager:
                 key = f.read()
                 
         self.fernet = Fernet(key)
+        self.codec = CiphertextCodec(key)
     
     def encrypt_password(self, password: str) -> str:
-        """加密密码"""
+        """加密密码，返回一层 base64 编码的二进制密文"""
         try:
-            encrypted = self.fernet.encrypt(password.encode())
-            return b64encode(encrypted).decode()
+            return self.codec.encrypt_text(password.encode())
         except Exception as e:
             raise ValueError(f"加密失败：{str(e)}")
     
     def decrypt_password(self, encrypted_password: str) -> str:
-        """解密密码"""
+        """解密密码，旧格式（两层 base64 的 Fernet 令牌）也可以直接解密"""
         try:
-            decrypted = self.fernet.decrypt(b64decode(encrypted_password))
+            decrypted = self.codec.decrypt_text(encrypted_password)
             return decrypted.decode()
         except Exception as e:
             raise ValueError(f"解密失败：{str(e)}")
     
+    def encrypt_many(self, 
+                     passwords: Iterable[str], 
+                     workers: Optional[int] = None, 
+                     binary: bool = False) -> Tuple[List[Optional[Union[str, bytes]]], Dict[int, str]]:
+        """批量加密，返回 (按输入顺序的密文, {下标: 错误信息})
+        
+        binary 为 True 时返回 encrypt_bytes 的二进制密文，否则与 encrypt_password 相同。
+        条数较多时分块交给线程池，workers 默认为 CPU 核数；单条失败不影响其他条目，
+        失败条目的结果为 None。
+        """
+        encrypt = self.codec.encrypt if binary else self.codec.encrypt_text
+        return _apply_many(lambda password: encrypt(password.encode()), passwords, workers, "加密失败：")
+    
+    def decrypt_many(self, 
+                     encrypted: Iterable[Union[str, bytes]], 
+                     workers: Optional[int] = None) -> Tuple[List[Optional[str]], Dict[int, str]]:
+        """批量解密，返回 (按输入顺序的明文, {下标: 错误信息})
+        
+        每条可以是文本密文（encrypt_password 的结果，包括旧格式）或二进制密文。
+        """
+        codec = self.codec
+        
+        def decrypt(item: Union[str, bytes]) -> str:
+            if isinstance(item, str):
+                return codec.decrypt_text(item).decode()
+            return codec.decrypt(item).decode()
+            
+        return _apply_many(decrypt, encrypted, workers, "解密失败：")
+    
+    def derive_subkey(self, purpose: bytes) -> bytes:
+        """由主密钥派生的子密钥（HKDF），用于需要密钥但不应单独保存密钥的场合"""
+        return self.codec.derive_key(purpose)
+    
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        """加密为二进制密文，适合直接存入 BLOB 列"""
+        return self.codec.encrypt(data)
+    
+    def decrypt_bytes(self, blob: bytes) -> bytes:
+        """解密 encrypt_bytes 的结果，也接受旧格式的文本密文；失败时抛出 ValueError"""
+        return self.codec.decrypt(blob)
+    
+    @property
+    def kdf_params(self) -> KdfParams:
+        """保存主密码文件时使用的 KDF 参数，第一次使用时校准一次并写入 kdf.json"""
+        if self._kdf_params is None:
+            try:
+                with open(self.kdf_file, encoding='utf-8') as f:
+                    params = KdfParams(**json.load(f))
+                validate_params(params)
+                self._kdf_params = params
+            except (OSError, ValueError, TypeError):
+                self.calibrate_kdf()
+        return self._kdf_params
+    
+    def calibrate_kdf(self, 
+                      algorithm: Optional[str] = None, 
+                      target_seconds: float = DEFAULT_TARGET_SECONDS) -> KdfParams:
+        """重新测量并保存 KDF 参数；已有文件的参数记录在各自的文件头中，不受影响"""
+        params = calibrate(algorithm, target_seconds)
+        with open(self.kdf_file, 'w', encoding='utf-8') as f:
+            json.dump(params._asdict(), f)
+        self._kdf_params = params
+        return params
+    
+    def clear_key_cache(self):
+        """清除所有缓存的派生密钥"""
+        with self._cache_lock:
+            self._key_cache.clear()
+    
+    def _password_digest(self, master_password: str) -> bytes:
+        return hashlib.blake2b(master_password.encode(), key=self._cache_secret, digest_size=32).digest()
+    
+    @staticmethod
+    def _cache_get(cache: OrderedDict, key: Tuple, now: float):
+        """取出未过期的缓存值，顺便清除已过期的条目"""
+        while cache:
+            oldest = next(iter(cache))
+            if cache[oldest][1] > now:
+                break
+            del cache[oldest]
+        entry = cache.get(key)
+        return entry[0] if entry is not None else None
+    
+    @staticmethod
+    def _cache_put(cache: OrderedDict, key: Tuple, value, now: float):
+        # 按写入时间排序，最早写入的最先过期或被淘汰
+        cache.pop(key, None)
+        cache[key] = (value, now + KEY_CACHE_TTL)
+        while len(cache) > KEY_CACHE_SIZE:
+            cache.popitem(last=False)
+    
+    def _master_codec(self, master_password: str, salt: bytes, params: KdfParams) -> CiphertextCodec:
+        """由主密码派生密钥，有效期内相同的盐值和参数直接使用缓存"""
+        cache_key = (salt, params, self._password_digest(master_password))
+        with self._cache_lock:
+            codec = self._cache_get(self._key_cache, cache_key, time.monotonic())
+        if codec is not None:
+            return codec
+        # 派生在锁外进行，不阻塞其他线程使用已缓存的密钥
+        codec = CiphertextCodec(urlsafe_b64encode(derive_key(master_password.encode(), salt, params)))
+        with self._cache_lock:
+            self._cache_put(self._key_cache, cache_key, codec, time.monotonic())
+        return codec
+    
+    def open_vault(self, 
+                   master_password: str, 
+                   file_path: Optional[str] = None, 
+                   create: bool = True) -> Vault:
+        """打开保管库（默认 ~/.password_generator/vault.pgv），不存在时按当前 KDF 参数创建
+        
+        打开时只派生一次密钥；主密码错误时抛出 ValueError。
+        """
+        path = Path(file_path) if file_path else self.vault_file
+        if path.exists():
+            params, salt = Vault.read_kdf(path)
+            return Vault(path, self._master_codec(master_password, salt, params))
+        if not create:
+            raise ValueError(f"保管库不存在：{path}")
+        params = self.kdf_params
+        salt = os.urandom(SALT_SIZE)
+        return Vault.create(path, self._master_codec(master_password, salt, params), params, salt)
+    
     def save_password_to_file(self, 
                              password: str, 
                              file_path: str, 
@@ -58,25 +244,21 @@ class EncryptionManager:
         try:
             # 如果提供了主密码，使用它来生成新的加密密钥
             if master_password:
-                salt = os.urandom(16)
-                kdf = PBKDF2HMAC(
-                    algorithm=hashes.SHA256(),
-                    length=32,
-                    salt=salt,
-                    iterations=100000,
-                )
-                key = b64encode(kdf.derive(master_password.encode()))
-                fernet = Fernet(key)
-                encrypted = fernet.encrypt(password.encode())
+                # 每个文件使用新的盐值，不同文件不能共用一次暴力破解；
+                # 派生的密钥按盐值缓存，之后读取该文件时不再派生
+                params = self.kdf_params
+                salt = os.urandom(SALT_SIZE)
+                codec = self._master_codec(master_password, salt, params)
+                encrypted = codec.encrypt(password.encode())
             else:
                 # 使用默认密钥
-                encrypted = self.fernet.encrypt(password.encode())
+                encrypted = self.codec.encrypt(password.encode())
             
             # 保存加密后的密码
             with open(file_path, 'wb') as f:
                 if master_password:
-                    # 如果使用主密码，需要保存salt
-                    f.write(salt)
+                    # 如果使用主密码，需要保存 KDF 参数和salt
+                    f.write(pack_header(params, salt))
                 f.write(encrypted)
                 
             return True
@@ -90,23 +272,14 @@ class EncryptionManager:
         try:
             with open(file_path, 'rb') as f:
                 if master_password:
-                    # 读取salt
-                    salt = f.read(16)
-                    # 重新生成密钥
-                    kdf = PBKDF2HMAC(
-                        algorithm=hashes.SHA256(),
-                        length=32,
-                        salt=salt,
-                        iterations=100000,
-                    )
-                    key = b64encode(kdf.derive(master_password.encode()))
-                    fernet = Fernet(key)
-                    encrypted = f.read()
-                    decrypted = fernet.decrypt(encrypted)
+                    # 读取 KDF 参数和salt（旧格式只有salt），重新生成或从缓存取出密钥
+                    params, salt, encrypted = unpack_header(f.read())
+                    codec = self._master_codec(master_password, salt, params)
+                    decrypted = codec.decrypt(encrypted)
                 else:
                     # 使用默认密钥
                     encrypted = f.read()
-                    decrypted = self.fernet.decrypt(encrypted)
+                    decrypted = self.codec.decrypt(encrypted)
                 
                 return decrypted.decode()
         except Exception:
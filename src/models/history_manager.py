@@ -1,24 +1,208 @@
+import hashlib
+import json
+import queue
+import secrets
 import sqlite3
-from datetime import datetime
-from typing import List, Dict
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable, List, Dict, Optional, Sequence, Tuple, Union
 from pathlib import Path
 
+from .reuse_filter import BloomFilter
+
+if TYPE_CHECKING:
+    from .encryption_manager import EncryptionManager
+
+# 等待其他进程释放写锁的最长时间（秒）
+BUSY_TIMEOUT = 10.0
+
+# add_records 每次 executemany 的行数
+INSERT_CHUNK_SIZE = 5000
+
+# 后台写入线程：队列容量（条）、每次组提交的最大条数、最长等待时间（秒）
+WRITE_QUEUE_SIZE = 50000
+WRITE_BATCH_SIZE = 2000
+WRITE_FLUSH_INTERVAL = 0.2
+
+# 重复检测的布隆过滤器初始容量（条），超出后按 4 倍扩容重建
+REUSE_FILTER_CAPACITY = 1_000_000
+
+# 后台写入线程的停止标记
+_STOP = object()
+
+# 筛选条件：参数名 -> (列, 比较运算符)，时间范围为 [start, end)
+_FILTERS = {
+    'start': ('created_at', '>='),
+    'end': ('created_at', '<'),
+    'min_length': ('length', '>='),
+    'max_length': ('length', '<='),
+    'min_strength': ('strength', '>='),
+    'max_strength': ('strength', '<='),
+    'min_entropy': ('entropy', '>='),
+    'max_entropy': ('entropy', '<='),
+}
+
+# 每个连接建立后执行的调优参数
+_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",      # WAL 模式下只在检查点时 fsync
+    "PRAGMA cache_size = -16000",       # 16 MB 页缓存
+    "PRAGMA mmap_size = 268435456",     # 256 MB 内存映射读取
+    "PRAGMA temp_store = MEMORY",
+)
+
+def _normalize_record(record: Sequence) -> tuple:
+    """检查一条待写入的记录，返回 (password, length, strength, entropy, expiry_date)
+    
+    格式无效时抛出 ValueError，说明哪一项无效。
+    """
+    try:
+        record = tuple(record)
+    except TypeError:
+        raise ValueError(f"历史记录格式无效：{record!r}")
+    if len(record) == 4:
+        record += (None,)
+    elif len(record) != 5:
+        raise ValueError(f"历史记录应为4或5项：{len(record)}项")
+    password, length, strength, entropy, _ = record
+    if not isinstance(password, str) or not password:
+        raise ValueError("历史记录的密码必须是非空字符串")
+    try:
+        password.encode('utf-8')
+    except UnicodeEncodeError:
+        raise ValueError("历史记录的密码包含无效字符")
+    for name, value in (('length', length), ('strength', strength), ('entropy', entropy)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"历史记录的 {name} 必须是数字：{value!r}")
+    return record
+
+def _day(value: Union[date, str]) -> str:
+    """把日期转换为 'YYYY-MM-DD'，与 date(created_at) 的格式一致"""
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10]
+
 class HistoryManager:
-    def __init__(self):
-        # 确保数据目录存在
-        data_dir = Path.home() / '.password_generator'
-        data_dir.mkdir(exist_ok=True)
+    def __init__(self,
+                 db_path: Optional[Union[str, Path]] = None,
+                 write_behind: bool = False,
+                 encryption_manager: Optional['EncryptionManager'] = None):
+        if db_path is None:
+            # 确保数据目录存在
+            data_dir = Path.home() / '.password_generator'
+            data_dir.mkdir(exist_ok=True)
+            
+            # 数据库文件路径
+            db_path = data_dir / 'history.db'
+        self.db_path = Path(db_path)
         
-        # 数据库文件路径
-        self.db_path = data_dir / 'history.db'
+        # 整个管理器共用一个长连接，多线程访问时由锁串行化
+        self._lock = threading.RLock()
+        self._conn = self._connect()
+        # 本连接提交的写事务次数，见 data_revision
+        self._revision = 0
+        # 重复检测：密码指纹的密钥（保存在数据库中）和首次查询时加载的布隆过滤器
+        self._fingerprint_key = b''
+        # 启用加密前使用的明文密钥（加密后保存在数据库中），用于继续查询旧指纹
+        self._legacy_fingerprint_key: Optional[bytes] = None
+        self._reuse_filter: Optional[BloomFilter] = None
+        self._reuse_filter_dirty = False
+        # 可选的静态加密：新记录的密码以二进制密文写入，查询结果中保持密文，
+        # 需要显示或复制时再调用 decrypt_password；未加密的旧记录仍是文本
+        self.encryption_manager = encryption_manager
+        if encryption_manager is not None:
+            # 删除、覆盖的内容用 0 填充，旧的明文不会留在空闲页中
+            self._conn.execute("PRAGMA secure_delete = ON")
         
         # 初始化数据库
         self._init_database()
+        
+        # 可选的后台写入线程，见 start_writer
+        self._queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'queued': 0,
+            'written': 0,
+            'failed': 0,
+            'flushes': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+            'last_error': None,
+        }
+        if write_behind:
+            self.start_writer()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """打开并调优数据库连接"""
+        # isolation_level=None：由 _transaction 显式控制事务
+        conn = sqlite3.connect(str(self.db_path),
+                               timeout=BUSY_TIMEOUT,
+                               isolation_level=None,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT * 1000)}")
+        # 新建的数据库启用增量 VACUUM：必须在数据库文件真正创建之前设置，
+        # 而切换到 WAL 就会写入文件头，因此放在 journal_mode 之前；已有数据库不受影响，见 reclaim_space
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # WAL 允许多个进程同时读，写入互不阻塞读取；该设置保存在数据库文件中
+        conn.execute("PRAGMA journal_mode = WAL")
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        """写事务：BEGIN IMMEDIATE 在开始时就获取写锁，
+        其他进程持有写锁时按 busy_timeout 等待，而不是在提交时报 database is locked"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            else:
+                try:
+                    cursor.execute("COMMIT")
+                except BaseException:
+                    # 提交失败（磁盘已满、I/O 错误、SQLITE_BUSY 等）时事务仍然打开，
+                    # 必须回滚，否则共用连接上之后的 BEGIN 都会失败
+                    if self._conn.in_transaction:
+                        cursor.execute("ROLLBACK")
+                    raise
+                self._revision += 1
+    
+    def close(self):
+        """关闭数据库连接，关闭前先写入后台队列中的全部记录"""
+        self.stop_writer()
+        with self._lock:
+            if self._reuse_filter is not None and self._reuse_filter_dirty:
+                try:
+                    self._reuse_filter.save(self._reuse_filter_path)
+                except OSError:
+                    # 过滤器只是缓存，下次打开时会从指纹表重建
+                    pass
+                self._reuse_filter_dirty = False
+            if self._conn is not None:
+                # 让查询规划器根据需要更新索引统计信息，以便在多个索引间正确选择
+                self._conn.execute("PRAGMA optimize")
+                self._conn.close()
+                self._conn = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
     
     def _init_database(self):
         """初始化数据库表结构"""
-        with sqlite3.connect(str(self.db_path)) as conn:
-            cursor = conn.cursor()
+        with self._transaction() as cursor:
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS password_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -30,7 +214,103 @@ class HistoryManager:
                     expiry_date TIMESTAMP
                 )
             """)
-            conn.commit()
+            # 按时间的索引：(created_at, id) 满足按时间倒序的键集分页，
+            # 其余列使按时间范围的筛选和统计只扫描索引，不读取表中的密码文本。
+            # 一个索引同时承担两种用途，每次插入少维护一个索引
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_password_history_time
+                ON password_history (created_at, id, strength, entropy, length)
+            """)
+            # 旧版本的分页索引 (created_at, id) 已被上面的索引取代
+            cursor.execute("DROP INDEX IF EXISTS idx_password_history_created_at")
+            # 按强度、熵值筛选（如查找弱密码）时的范围扫描
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_password_history_strength
+                ON password_history (strength, created_at)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_password_history_entropy
+                ON password_history (entropy)
+            """)
+            
+            # 按天、强度汇总的统计表，由写入路径增量维护（见 _update_statistics）。
+            # 不使用触发器：触发器会让 clear_history 的整表清空退化为逐行删除
+            exists = cursor.execute("""
+                SELECT 1 FROM sqlite_master
+                WHERE type = 'table' AND name = 'history_daily_stats'
+            """).fetchone()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS history_daily_stats (
+                    day TEXT NOT NULL,
+                    strength INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    entropy_sum REAL NOT NULL,
+                    PRIMARY KEY (day, strength)
+                ) WITHOUT ROWID
+            """)
+            if not exists:
+                # 首次创建时从已有记录回填
+                self._update_statistics(cursor, "1")
+            
+            # 已生成密码的指纹（带密钥的哈希，不含明文），用于重复检测，删除记录时保留
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS history_meta (
+                    name TEXT PRIMARY KEY,
+                    value BLOB NOT NULL
+                )
+            """)
+            meta = dict(cursor.execute("SELECT name, value FROM history_meta").fetchall())
+            rekey = False
+            if self.encryption_manager is not None:
+                # 加密的历史记录：指纹密钥由主密钥派生，不保存在数据库中，
+                # 否则拿到数据库文件就能对指纹逐个猜测密码，加密形同虚设。
+                # 数据库中只保存校验值，用于发现数据库属于其他主密钥
+                self._fingerprint_key = self.encryption_manager.derive_subkey(b'history fingerprint')
+                check = hashlib.blake2b(b'fingerprint key check', digest_size=16,
+                                        key=self._fingerprint_key).digest()
+                stored_check = meta.get('fingerprint_key_check')
+                if stored_check is not None and stored_check != check:
+                    # 其他主密钥的指纹无法换算，清除会让已删除的密码可以再次生成
+                    raise ValueError("历史记录属于其他主密钥，无法打开")
+                if 'fingerprint_key' in meta:
+                    # 从未加密的数据库升级：旧密钥改为加密保存，旧指纹（包括已删除记录的）
+                    # 保留在指纹表中继续参与重复检测；现存记录另外按新密钥计算指纹
+                    rekey = True
+                    cursor.execute(
+                        "INSERT OR REPLACE INTO history_meta (name, value) VALUES ('legacy_fingerprint_key', ?)",
+                        (self.encryption_manager.encrypt_bytes(meta['fingerprint_key']),))
+                    cursor.execute("DELETE FROM history_meta WHERE name = 'fingerprint_key'")
+                    self._legacy_fingerprint_key = meta['fingerprint_key']
+                elif 'legacy_fingerprint_key' in meta:
+                    self._legacy_fingerprint_key = self.encryption_manager.decrypt_bytes(
+                        meta['legacy_fingerprint_key'])
+                if stored_check is None:
+                    cursor.execute(
+                        "INSERT INTO history_meta (name, value) VALUES ('fingerprint_key_check', ?)",
+                        (check,))
+            elif 'fingerprint_key_check' in meta:
+                raise ValueError("历史记录已加密，需要提供加密管理器")
+            elif 'fingerprint_key' in meta:
+                self._fingerprint_key = meta['fingerprint_key']
+            else:
+                self._fingerprint_key = secrets.token_bytes(32)
+                cursor.execute(
+                    "INSERT INTO history_meta (name, value) VALUES ('fingerprint_key', ?)",
+                    (self._fingerprint_key,))
+            exists = cursor.execute("""
+                SELECT 1 FROM sqlite_master
+                WHERE type = 'table' AND name = 'password_fingerprints'
+            """).fetchone()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS password_fingerprints (
+                    id INTEGER PRIMARY KEY,
+                    fingerprint BLOB NOT NULL UNIQUE
+                )
+            """)
+            # 布隆过滤器的标记随密钥变化，换用新密钥后会从指纹表自动重建
+            if not exists or rekey:
+                rows = cursor.execute("SELECT password FROM password_history").fetchall()
+                self._insert_fingerprints(cursor, self._readable_passwords(row[0] for row in rows))
     
     def add_record(self, 
                    password: str, 
@@ -40,178 +320,634 @@ class HistoryManager:
                    expiry_date: datetime = None) -> bool:
         """添加新的密码记录"""
         try:
-            with sqlite3.connect(str(self.db_path)) as conn:
-                cursor = conn.cursor()
+            stored = password
+            if self.encryption_manager is not None:
+                stored = self.encryption_manager.encrypt_bytes(password.encode())
+            with self._transaction() as cursor:
                 cursor.execute("""
                     INSERT INTO password_history 
                     (password, length, strength, entropy, expiry_date)
                     VALUES (?, ?, ?, ?, ?)
-                """, (password, length, strength, entropy, expiry_date))
-                conn.commit()
+                """, (stored, length, strength, entropy, expiry_date))
+                self._update_statistics(cursor, "id = ?", (cursor.lastrowid,))
+                self._insert_fingerprints(cursor, (password,))
                 return True
-        except sqlite3.Error:
+        except (sqlite3.Error, ValueError):
             return False
-
-if __name__ == "__main__":
-    # 测试 HistoryManager 类
-    manager = HistoryManager()
-
-    print("初始化 HistoryManager 完成.")
-    print(f"数据库文件位于: {manager.db_path}")
-
-    # 添加一些记录
-    print("\n添加测试记录...")
-    manager.add_record("test_password1", 12, 3, 80.5)
-    manager.add_record("securepass123", 10, 4, 95.1, datetime(2024, 12, 31))
-    print("测试记录添加完成.")
-
-    # 获取最近的记录
-    print("\n获取最近的10条记录:")
-    recent_records = manager.get_recent_records(10)
-    if recent_records:
-        for record in recent_records:
-            print(record)
-    else:
-        print("没有找到记录.")
-
-    # 获取一条记录的 ID 用于删除测试 (假设第一条是我们刚添加的)
-    if recent_records:
-        record_to_delete_id = recent_records[0]['id']
-        print(f"\n尝试删除记录 ID: {record_to_delete_id}...")
-        if manager.delete_record(record_to_delete_id):
-            print(f"记录 ID: {record_to_delete_id} 删除成功.")
-        else:
-            print(f"记录 ID: {record_to_delete_id} 删除失败.")
+    
+    def add_records(self,
+                    records: Iterable[Sequence],
+                    chunk_size: int = INSERT_CHUNK_SIZE) -> int:
+        """在一个事务中批量添加密码记录，返回添加的条数
         
-        print("\n再次获取最近的10条记录 (删除后):")
-        updated_records = manager.get_recent_records(10)
-        if updated_records:
-            for record in updated_records:
-                print(record)
-        else:
-            print("没有找到记录.")
-
-    # 清空历史记录 (可选，如果需要保持数据则注释掉)
-    # print("\n清空所有历史记录...")
-    # if manager.clear_history():
-    #     print("历史记录已清空.")
-    # else:
-    #     print("清空历史记录失败.")
-
-    # print("\n再次获取记录 (清空后):")
-    # final_records = manager.get_recent_records()
-    # if not final_records:
-    #     print("历史记录为空.")
-    # else:
-    #     for record in final_records:
-    #         print(record)
-
-    print("\n测试完成.")
-
+        records 的每一项为 (password, length, strength, entropy) 或
+        (password, length, strength, entropy, expiry_date)。
+        按 chunk_size 分块调用 executemany，内存占用与总条数无关；
+        任何一块失败（包括格式无效的记录）时整个事务回滚并返回 0。同一批记录的生成时间相同。
+        设置了 encryption_manager 时每块密码用 encrypt_many 一次加密（条数多时并行），
+        指纹仍由明文计算。
+        """
+        if chunk_size < 1:
+            raise ValueError("分块大小必须大于0")
+        try:
+            return self._insert_records(records, chunk_size)
+        except (sqlite3.Error, ValueError):
+            return 0
+    
+    def _insert_records(self, records: Iterable[Sequence], chunk_size: int) -> int:
+        """add_records 的实现，失败时抛出异常"""
+        iterator = iter(records)
+        count = 0
+        with self._transaction() as cursor:
+            # 同一批记录使用同一个生成时间，统计可以在插入时直接按强度累加
+            created_at = cursor.execute("SELECT CURRENT_TIMESTAMP").fetchone()[0]
+            # 强度 -> [条数, 熵值之和]
+            totals: Dict[int, List] = {}
+            while True:
+                chunk = [_normalize_record(record) + (created_at,)
+                         for record in islice(iterator, chunk_size)]
+                if not chunk:
+                    break
+                for record in chunk:
+                    total = totals.get(record[2])
+                    if total is None:
+                        total = totals[record[2]] = [0, 0.0]
+                    total[0] += 1
+                    total[1] += record[3]
+                passwords = [record[0] for record in chunk]
+                if self.encryption_manager is not None:
+                    encrypted, errors = self.encryption_manager.encrypt_many(passwords, binary=True)
+                    if errors:
+                        raise ValueError(next(iter(errors.values())))
+                    chunk = [(ciphertext,) + record[1:] for ciphertext, record in zip(encrypted, chunk)]
+                cursor.executemany("""
+                    INSERT INTO password_history 
+                    (password, length, strength, entropy, expiry_date, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, chunk)
+                self._insert_fingerprints(cursor, passwords)
+                count += len(chunk)
+            cursor.executemany("""
+                INSERT INTO history_daily_stats (day, strength, count, entropy_sum)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (day, strength) DO UPDATE SET
+                    count = history_daily_stats.count + excluded.count,
+                    entropy_sum = history_daily_stats.entropy_sum + excluded.entropy_sum
+            """, [(created_at[:10], strength, total[0], total[1])
+                  for strength, total in totals.items()])
+        return count
+    
+    def start_writer(self,
+                     queue_size: int = WRITE_QUEUE_SIZE,
+                     batch_size: int = WRITE_BATCH_SIZE,
+                     flush_interval: float = WRITE_FLUSH_INTERVAL):
+        """启动后台写入线程
+        
+        queue_records 放入的记录由该线程按组提交：凑满 batch_size 条，
+        或距本组第一条记录超过 flush_interval 秒时写入一次。
+        队列满 queue_size 条时 queue_records 阻塞（背压）。
+        """
+        if self._writer is not None:
+            return
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = threading.Thread(
+            target=self._writer_loop,
+            args=(self._queue, batch_size, flush_interval),
+            name='history-writer',
+            daemon=True,
+        )
+        self._writer.start()
+    
+    def stop_writer(self):
+        """写入队列中剩余的记录并停止后台写入线程"""
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._writer = None
+        self._queue = None
+    
+    def queue_records(self,
+                      records: Iterable[Sequence],
+                      timeout: Optional[float] = None) -> int:
+        """把记录交给后台写入线程，返回放入的条数
+        
+        记录格式与 add_records 相同。未启动后台写入线程时直接调用 add_records。
+        格式无效的记录在放入前被跳过，不会让同一组的其他记录写入失败；
+        跳过的条数计入 writer_stats 的 failed，原因记录在 last_error。
+        队列已满时最多等待 timeout 秒（None 表示一直等待），超时抛出 queue.Full。
+        """
+        if self._queue is None:
+            return self.add_records(records)
+        count = 0
+        rejected = 0
+        error = None
+        try:
+            for record in records:
+                try:
+                    record = _normalize_record(record)
+                except ValueError as e:
+                    rejected += 1
+                    error = str(e)
+                    continue
+                self._queue.put(record, timeout=timeout)
+                count += 1
+        finally:
+            with self._stats_lock:
+                self._stats['queued'] += count
+                self._stats['failed'] += rejected
+                if error is not None:
+                    self._stats['last_error'] = error
+        return count
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待此前放入队列的记录全部写入，超时返回 False"""
+        if self._queue is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+    
+    def writer_stats(self) -> Dict:
+        """后台写入的统计：队列深度、已放入/已写入/失败条数、组提交次数和耗时（毫秒），
+        以及最近一次失败的原因（last_error）"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize() if self._queue is not None else 0
+        flushes = stats['flushes']
+        stats['avg_flush_ms'] = stats.pop('total_flush_ms') / flushes if flushes else 0.0
+        return stats
+    
+    def _writer_loop(self, records_queue: queue.Queue, batch_size: int, flush_interval: float):
+        """后台写入线程：按条数或时间触发组提交"""
+        stopping = False
+        while not stopping:
+            batch = []
+            waiters = []
+            item = records_queue.get()
+            deadline = time.monotonic() + flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    # flush 请求：立即提交当前这一组
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = records_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                    
+            if stopping:
+                # 停止前取出队列中剩余的全部记录
+                while True:
+                    try:
+                        item = records_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+                        
+            try:
+                if batch:
+                    self._write_batch(batch)
+            finally:
+                # 无论写入是否成功都要唤醒等待者，flush 不会一直阻塞
+                for waiter in waiters:
+                    waiter.set()
+    
+    def _write_batch(self, batch: List[tuple]):
+        # 记录已由 queue_records 检查过格式，这里的失败来自数据库本身（磁盘已满等）
+        started = time.perf_counter()
+        error = None
+        try:
+            written = self._insert_records(batch, INSERT_CHUNK_SIZE)
+        except Exception as e:
+            # 意外异常不能让写入线程退出，否则队列写满后 queue_records 和 flush 会一直阻塞；
+            # 整组计为失败，原因见 writer_stats 的 last_error
+            written = 0
+            error = f"{type(e).__name__}: {e}"
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            stats = self._stats
+            stats['written'] += written
+            stats['failed'] += len(batch) - written
+            stats['flushes'] += 1
+            stats['last_flush_ms'] = elapsed
+            stats['max_flush_ms'] = max(stats['max_flush_ms'], elapsed)
+            stats['total_flush_ms'] += elapsed
+            if error is not None:
+                stats['last_error'] = error
+    
+    def decrypt_password(self, stored: Union[str, bytes]) -> str:
+        """记录中 password 字段的明文：加密的记录解密，未加密的旧记录原样返回
+        
+        解密失败或未设置 encryption_manager 时抛出 ValueError。
+        """
+        if isinstance(stored, str):
+            return stored
+        if self.encryption_manager is None:
+            raise ValueError("历史记录已加密，需要提供加密管理器")
+        return self.encryption_manager.decrypt_bytes(stored).decode()
+    
+    def _readable_passwords(self, stored_values: Iterable[Union[str, bytes]]) -> Iterable[str]:
+        """逐条解密，跳过无法解密的记录"""
+        for stored in stored_values:
+            try:
+                yield self.decrypt_password(stored)
+            except ValueError:
+                continue
+    
+    def encrypt_existing(self, batch_size: int = INSERT_CHUNK_SIZE) -> int:
+        """把未加密的旧记录逐批改写为密文，返回改写的条数
+        
+        每批一个事务，批与批之间释放锁，可以在后台线程中运行；
+        管理器关闭后在下一批开始前停止。完成后截断 WAL，旧的明文不再留在日志中。
+        """
+        if self.encryption_manager is None:
+            raise ValueError("未设置加密管理器")
+        if batch_size < 1:
+            raise ValueError("分块大小必须大于0")
+        total = 0
+        last_id = 0
+        while True:
+            with self._lock:
+                if self._conn is None:
+                    return total
+                try:
+                    with self._transaction() as cursor:
+                        rows = cursor.execute("""
+                            SELECT id, password FROM password_history
+                            WHERE id > ? AND typeof(password) = 'text'
+                            ORDER BY id LIMIT ?
+                        """, (last_id, batch_size)).fetchall()
+                        encrypted, _ = self.encryption_manager.encrypt_many(
+                            [row[1] for row in rows], binary=True)
+                        # 无法加密的记录（如含有无效字符）保持原样
+                        updates = [(ciphertext, row[0]) for ciphertext, row in zip(encrypted, rows)
+                                   if ciphertext is not None]
+                        cursor.executemany(
+                            "UPDATE password_history SET password = ? WHERE id = ?", updates)
+                    if not rows:
+                        if total:
+                            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                        return total
+                except sqlite3.Error:
+                    return total
+            total += len(updates)
+            last_id = rows[-1][0]
+    
+    def fingerprint(self, password: str) -> bytes:
+        """密码的指纹：以数据库专属密钥计算的 16 字节 BLAKE2b 摘要"""
+        return hashlib.blake2b(password.encode('utf-8'), digest_size=16,
+                               key=self._fingerprint_key).digest()
+    
+    def _insert_fingerprints(self, cursor: sqlite3.Cursor, passwords: Iterable[str]):
+        cursor.executemany(
+            "INSERT OR IGNORE INTO password_fingerprints (fingerprint) VALUES (?)",
+            ((self.fingerprint(password),) for password in passwords)
+        )
+    
+    def find_reused(self, passwords: Sequence[str]) -> List[bool]:
+        """检查每个密码是否已经生成过（包括已从历史记录中删除的）
+        
+        先查询内存中的布隆过滤器，只有过滤器命中时才查询指纹表确认，
+        因此每个密码的开销为常数，与历史记录条数无关。
+        可作为 PasswordGenerator 的 reuse_checker。
+        """
+        with self._lock:
+            bloom = self._sync_reuse_filter()
+            result = []
+            for password in passwords:
+                digests = [self.fingerprint(password)]
+                if self._legacy_fingerprint_key is not None:
+                    # 启用加密前生成的密码只有旧密钥的指纹
+                    digests.append(hashlib.blake2b(password.encode('utf-8'), digest_size=16,
+                                                   key=self._legacy_fingerprint_key).digest())
+                reused = any(
+                    digest in bloom and self._conn.execute(
+                        "SELECT 1 FROM password_fingerprints WHERE fingerprint = ?",
+                        (digest,)
+                    ).fetchone() is not None
+                    for digest in digests
+                )
+                result.append(reused)
+            return result
+    
+    @property
+    def _reuse_filter_path(self) -> Path:
+        return self.db_path.with_name(self.db_path.name + '.bloom')
+    
+    def _sync_reuse_filter(self) -> BloomFilter:
+        """加载布隆过滤器，并加入其后（由本进程或其他进程）新写入的指纹"""
+        bloom = self._reuse_filter
+        # 文件标记由密钥派生，数据库被替换后旧的过滤器不会被误用
+        tag = hashlib.blake2b(b'reuse-filter', digest_size=8, key=self._fingerprint_key).digest()
+        if bloom is None:
+            bloom = BloomFilter.load(self._reuse_filter_path)
+            if bloom is None or bloom.tag != tag:
+                bloom = BloomFilter(REUSE_FILTER_CAPACITY)
+                bloom.tag = tag
+            self._reuse_filter = bloom
+        
+        pending, last_id = self._conn.execute(
+            "SELECT COUNT(*), MAX(id) FROM password_fingerprints WHERE id > ?",
+            (bloom.synced_id,)
+        ).fetchone()
+        if not pending:
+            return bloom
+        if bloom.count + pending > bloom.capacity:
+            # 超出容量后误判率上升，按 4 倍容量从指纹表重建
+            capacity = bloom.capacity
+            while capacity < bloom.count + pending:
+                capacity *= 4
+            bloom = self._reuse_filter = BloomFilter(capacity)
+            bloom.tag = tag
+        rows = self._conn.execute(
+            "SELECT fingerprint FROM password_fingerprints WHERE id > ? AND id <= ?",
+            (bloom.synced_id, last_id)
+        )
+        bloom.add_many(row[0] for row in rows)
+        bloom.synced_id = last_id
+        self._reuse_filter_dirty = True
+        return bloom
     
     def get_recent_records(self, limit: int = 10) -> List[Dict]:
         """获取最近的密码记录"""
-        with sqlite3.connect(str(self.db_path)) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT * FROM password_history
-                ORDER BY created_at DESC
-                LIMIT ?
-            """, (limit,))
+        return self.get_records_before(None, limit)
+    
+    def get_records_before(self,
+                           cursor: Optional[Tuple[str, int]],
+                           page_size: int = 100) -> List[Dict]:
+        """按时间倒序的键集分页
+        
+        cursor 为上一页最后一条记录的 (created_at, id)，见 record_cursor；
+        为 None 时返回最新的一页。每页都是一次索引范围扫描，与翻到第几页无关。
+        """
+        return self.find_records(cursor, page_size)
+    
+    def find_records(self,
+                     cursor: Optional[Tuple[str, int]] = None,
+                     limit: int = 100,
+                     **filters) -> List[Dict]:
+        """按条件筛选记录，按时间倒序分页返回
+        
+        filters 可以是：
+            start, end: 生成时间范围 [start, end)，datetime、date 或字符串
+            min_length, max_length: 长度范围（含边界）
+            min_strength, max_strength: 强度范围（0-100，含边界）
+            min_entropy, max_entropy: 熵值范围（含边界）
+        值为 None 的条件会被忽略。cursor 的含义与 get_records_before 相同。
+        """
+        where, params = self._where(filters)
+        if cursor is not None:
+            where.append("(created_at, id) < (?, ?)")
+            params.extend(cursor)
+        sql = "SELECT * FROM password_history"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        
+        with self._lock:
+            rows = self._conn.execute(sql, params)
             
             records = []
-            for row in cursor.fetchall():
+            for row in rows.fetchall():
                 record = dict(row)
                 records.append(record)
             
             return records
     
-    def clear_history(self) -> bool:
-        """清空历史记录"""
-        try:
-            with sqlite3.connect(str(self.db_path)) as conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM password_history")
-                conn.commit()
-                return True
-        except sqlite3.Error:
-            return False
-
-if __name__ == "__main__":
-    # 测试 HistoryManager 类
-    manager = HistoryManager()
-
-    print("初始化 HistoryManager 完成.")
-    print(f"数据库文件位于: {manager.db_path}")
-
-    # 添加一些记录
-    print("\n添加测试记录...")
-    manager.add_record("test_password1", 12, 3, 80.5)
-    manager.add_record("securepass123", 10, 4, 95.1, datetime(2024, 12, 31))
-    print("测试记录添加完成.")
-
-    # 获取最近的记录
-    print("\n获取最近的10条记录:")
-    recent_records = manager.get_recent_records(10)
-    if recent_records:
-        for record in recent_records:
-            print(record)
-    else:
-        print("没有找到记录.")
-
-    # 获取一条记录的 ID 用于删除测试 (假设第一条是我们刚添加的)
-    if recent_records:
-        record_to_delete_id = recent_records[0]['id']
-        print(f"\n尝试删除记录 ID: {record_to_delete_id}...")
-        if manager.delete_record(record_to_delete_id):
-            print(f"记录 ID: {record_to_delete_id} 删除成功.")
-        else:
-            print(f"记录 ID: {record_to_delete_id} 删除失败.")
-        
-        print("\n再次获取最近的10条记录 (删除后):")
-        updated_records = manager.get_recent_records(10)
-        if updated_records:
-            for record in updated_records:
-                print(record)
-        else:
-            print("没有找到记录.")
-
-    # 清空历史记录 (可选，如果需要保持数据则注释掉)
-    # print("\n清空所有历史记录...")
-    # if manager.clear_history():
-    #     print("历史记录已清空.")
-    # else:
-    #     print("清空历史记录失败.")
-
-    # print("\n再次获取记录 (清空后):")
-    # final_records = manager.get_recent_records()
-    # if not final_records:
-    #     print("历史记录为空.")
-    # else:
-    #     for record in final_records:
-    #         print(record)
-
-    print("\n测试完成.")
-
+    def count_records(self, **filters) -> int:
+        """满足条件的记录数，条件见 find_records"""
+        return self._aggregate("SELECT COUNT(*) FROM password_history", filters)[0][0]
+    
+    def daily_counts(self, **filters) -> List[Tuple[str, int]]:
+        """每天生成的记录数 [(YYYY-MM-DD, 数量), ...]，按日期升序，条件见 find_records"""
+        rows = self._aggregate(
+            "SELECT date(created_at) AS day, COUNT(*) FROM password_history",
+            filters,
+            "GROUP BY day ORDER BY day"
+        )
+        return [(row[0], row[1]) for row in rows]
+    
+    def strength_histogram(self, **filters) -> Dict[int, int]:
+        """各强度值的记录数 {强度: 数量}，条件见 find_records"""
+        rows = self._aggregate(
+            "SELECT strength, COUNT(*) FROM password_history",
+            filters,
+            "GROUP BY strength ORDER BY strength"
+        )
+        return {row[0]: row[1] for row in rows}
+    
+    def mean_entropy(self, **filters) -> Optional[float]:
+        """平均熵值，没有满足条件的记录时返回 None，条件见 find_records"""
+        return self._aggregate("SELECT AVG(entropy) FROM password_history", filters)[0][0]
+    
+    def _aggregate(self, select: str, filters: Dict, suffix: str = '') -> List[sqlite3.Row]:
+        where, params = self._where(filters)
+        sql = select
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if suffix:
+            sql += " " + suffix
+        with self._lock:
+            # 在锁内取完结果，避免其他线程复用连接时游标被打断
+            return self._conn.execute(sql, params).fetchall()
+    
+    @staticmethod
+    def _where(filters: Dict) -> Tuple[List[str], List]:
+        """把筛选条件转换为 WHERE 子句和参数"""
+        where = []
+        params = []
+        for name, value in filters.items():
+            if name not in _FILTERS:
+                raise ValueError(f"未知的筛选条件：{name}")
+            if value is None:
+                continue
+            column, operator = _FILTERS[name]
+            if isinstance(value, datetime):
+                # 与 CURRENT_TIMESTAMP 的 'YYYY-MM-DD HH:MM:SS' 格式一致，才能按字符串比较
+                value = value.strftime('%Y-%m-%d %H:%M:%S')
+            elif isinstance(value, date):
+                value = value.isoformat()
+            where.append(f"{column} {operator} ?")
+            params.append(value)
+        return where, params
+    
+    @staticmethod
+    def record_cursor(record: Dict) -> Tuple[str, int]:
+        """记录在分页顺序中的位置，用作 get_records_before 的 cursor"""
+        return (record['created_at'], record['id'])
     
     def delete_record(self, record_id: int) -> bool:
         """删除指定的密码记录"""
         try:
-            with sqlite3.connect(str(self.db_path)) as conn:
-                cursor = conn.cursor()
+            with self._transaction() as cursor:
+                self._update_statistics(cursor, "id = ?", (record_id,), -1)
                 cursor.execute("""
                     DELETE FROM password_history
                     WHERE id = ?
                 """, (record_id,))
-                conn.commit()
                 return cursor.rowcount > 0
         except sqlite3.Error:
             return False
+    
+    def delete_records(self, record_ids: Iterable[int], vacuum: bool = False) -> int:
+        """在一个事务中用一条语句删除多条记录，返回删除的条数
+        
+        vacuum 为 True 时删除后回收空闲页，见 reclaim_space。
+        """
+        ids = json.dumps([int(record_id) for record_id in record_ids])
+        try:
+            with self._transaction() as cursor:
+                self._update_statistics(
+                    cursor, "id IN (SELECT value FROM json_each(?))", (ids,), -1)
+                cursor.execute("""
+                    DELETE FROM password_history
+                    WHERE id IN (SELECT value FROM json_each(?))
+                """, (ids,))
+                deleted = cursor.rowcount
+        except sqlite3.Error:
+            return 0
+        if vacuum and deleted:
+            self.reclaim_space()
+        return deleted
+    
+    def clear_history(self, vacuum: bool = False) -> bool:
+        """清空全部历史记录（包括尚未加载或仍在后台写入队列中的记录）
+        
+        不带 WHERE 的 DELETE 会被 SQLite 优化为直接清空表，耗时与行数无关。
+        vacuum 为 True 时随后回收空闲页，见 reclaim_space。
+        """
+        # 先写入队列中的记录，避免清空后又被写入
+        if self._writer is not None and threading.current_thread() is not self._writer:
+            self.flush()
+        try:
+            with self._transaction() as cursor:
+                cursor.execute("DELETE FROM password_history")
+                cursor.execute("DELETE FROM history_daily_stats")
+        except sqlite3.Error:
+            return False
+        if vacuum:
+            self.reclaim_space()
+        return True
+    
+    def _update_statistics(self,
+                           cursor: sqlite3.Cursor,
+                           where: str,
+                           params: Sequence = (),
+                           sign: int = 1):
+        """把满足 where 的记录计入（sign=1）或移出（sign=-1）按天汇总的统计表
+        
+        必须在写事务中、插入之后或删除之前调用。
+        """
+        cursor.execute(f"""
+            INSERT INTO history_daily_stats (day, strength, count, entropy_sum)
+            SELECT date(created_at), strength, {sign} * COUNT(*), {sign} * SUM(entropy)
+            FROM password_history
+            WHERE {where}
+            GROUP BY 1, 2
+            ON CONFLICT (day, strength) DO UPDATE SET
+                count = history_daily_stats.count + excluded.count,
+                entropy_sum = history_daily_stats.entropy_sum + excluded.entropy_sum
+        """, params)
+        if sign < 0:
+            cursor.execute("DELETE FROM history_daily_stats WHERE count <= 0")
+    
+    def rebuild_statistics(self) -> bool:
+        """根据全部记录重新生成统计表（例如数据库曾被旧版本直接修改后）"""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute("DELETE FROM history_daily_stats")
+                self._update_statistics(cursor, "1")
+                return True
+        except sqlite3.Error:
+            return False
+    
+    def daily_statistics(self,
+                         start: Optional[Union[date, str]] = None,
+                         end: Optional[Union[date, str]] = None) -> List[Dict]:
+        """按天汇总的统计，日期范围为 [start, end)
+        
+        每项为 {'day', 'count', 'mean_entropy', 'strengths': {强度: 数量}}，按日期升序。
+        只读取汇总表，耗时与天数成正比，与记录数无关。
+        """
+        where = []
+        params = []
+        if start is not None:
+            where.append("day >= ?")
+            params.append(_day(start))
+        if end is not None:
+            where.append("day < ?")
+            params.append(_day(end))
+        sql = "SELECT day, strength, count, entropy_sum FROM history_daily_stats"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY day"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        
+        days: List[Dict] = []
+        for day, strength, count, entropy_sum in rows:
+            if not days or days[-1]['day'] != day:
+                days.append({'day': day, 'count': 0, 'entropy_sum': 0.0, 'strengths': {}})
+            current = days[-1]
+            current['count'] += count
+            current['entropy_sum'] += entropy_sum
+            current['strengths'][strength] = count
+        for current in days:
+            current['mean_entropy'] = current.pop('entropy_sum') / current['count']
+        return days
+    
+    def data_revision(self) -> Tuple[int, int]:
+        """数据版本号：本连接或其他连接（如命令行工具）提交写入后会变化"""
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            return (self._revision, data_version)
+    
+    def reclaim_space(self, max_pages: Optional[int] = None) -> int:
+        """把空闲页归还给文件系统，返回回收的页数
+        
+        增量模式下每次最多回收 max_pages 页（None 表示全部）；
+        旧版本创建的数据库首次调用时会执行一次完整的 VACUUM 以切换到增量模式。
+        """
+        try:
+            with self._lock:
+                conn = self._conn
+                before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    conn.execute("VACUUM")
+                else:
+                    # incremental_vacuum 每执行一步只回收一页，而 execute 只执行一步；
+                    # executescript 会把语句执行到结束
+                    pages = '' if max_pages is None else f"({int(max_pages)})"
+                    conn.executescript(f"PRAGMA incremental_vacuum{pages};")
+                after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                # 把 WAL 中的改动写回主数据库文件，文件大小才会真正缩小
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                return before - after
+        except sqlite3.Error:
+            return 0
 
 if __name__ == "__main__":
-    # 测试 HistoryManager 类
-    manager = HistoryManager()
+    # 测试 HistoryManager 类（历史记录是加密保存的，需要加密管理器）
+    from .encryption_manager import EncryptionManager
+    manager = HistoryManager(encryption_manager=EncryptionManager())
 
     print("初始化 HistoryManager 完成.")
     print(f"数据库文件位于: {manager.db_path}")
@@ -263,4 +999,5 @@ if __name__ == "__main__":
     #     for record in final_records:
     #         print(record)
 
-    print("\n测试完成.")
\ No newline at end of file
+    manager.close()
+    print("\n测试完成.")
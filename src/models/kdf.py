@@ -0,0 +1,142 @@
+import math
+import struct
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+try:
+    # cryptography 44 起提供 Argon2id
+    from cryptography.hazmat.primitives.kdf.argon2 import Argon2id
+except ImportError:
+    Argon2id = None
+
+# 主密码文件头：魔数、版本、KDF 编号、三个 KDF 参数、盐值，之后是 Fernet 令牌
+_HEADER = struct.Struct('<4sBBxxIII16s')
+HEADER_SIZE = _HEADER.size
+_MAGIC = b'PGKF'
+_VERSION = 1
+SALT_SIZE = 16
+KEY_SIZE = 32
+
+# 默认的派生耗时目标（秒）
+DEFAULT_TARGET_SECONDS = 0.5
+
+
+class KdfParams(NamedTuple):
+    """KDF 及其参数，三个参数的含义随算法不同：
+
+    pbkdf2：cost 为迭代次数，memory、parallelism 为 0
+    scrypt：cost 为 log2(N)，memory 为块大小 r，parallelism 为 p
+    argon2id：cost 为迭代次数，memory 为内存用量（KiB），parallelism 为并行度
+    """
+    algorithm: str
+    cost: int
+    memory: int = 0
+    parallelism: int = 0
+
+
+# 没有文件头的旧格式文件：盐值之后直接是令牌，固定 PBKDF2-SHA256 10 万次
+LEGACY_PARAMS = KdfParams('pbkdf2', 100000)
+
+_ALGORITHM_IDS = {'pbkdf2': 1, 'scrypt': 2, 'argon2id': 3}
+_ALGORITHM_NAMES = {value: name for name, value in _ALGORITHM_IDS.items()}
+
+# 读取文件时参数的合理范围 (cost, memory, parallelism)，防止损坏或恶意的文件头占满内存或 CPU
+_LIMITS: Dict[str, Tuple[Tuple[int, int], Tuple[int, int], Tuple[int, int]]] = {
+    'pbkdf2': ((1000, 10_000_000), (0, 0), (0, 0)),
+    'scrypt': ((10, 22), (1, 32), (1, 16)),
+    'argon2id': ((1, 256), (8, 4 * 1024 * 1024), (1, 64)),
+}
+
+
+def available_algorithms() -> Tuple[str, ...]:
+    """当前环境可用的 KDF，按推荐顺序"""
+    if Argon2id is not None:
+        return 'argon2id', 'scrypt', 'pbkdf2'
+    return 'scrypt', 'pbkdf2'
+
+
+def validate_params(params: KdfParams):
+    if params.algorithm not in available_algorithms():
+        raise ValueError(f"不支持的 KDF：{params.algorithm}")
+    for value, (low, high) in zip(params[1:], _LIMITS[params.algorithm]):
+        if not low <= value <= high:
+            raise ValueError(f"KDF 参数超出范围：{params}")
+    if params.algorithm == 'argon2id' and params.memory < 8 * params.parallelism:
+        raise ValueError(f"KDF 参数超出范围：{params}")
+
+
+def derive_key(password: bytes, salt: bytes, params: KdfParams) -> bytes:
+    """按参数派生 32 字节密钥"""
+    if params.algorithm == 'pbkdf2':
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=KEY_SIZE, salt=salt, iterations=params.cost)
+    elif params.algorithm == 'scrypt':
+        kdf = Scrypt(salt=salt, length=KEY_SIZE, n=1 << params.cost, r=params.memory, p=params.parallelism)
+    elif params.algorithm == 'argon2id' and Argon2id is not None:
+        kdf = Argon2id(salt=salt, length=KEY_SIZE, iterations=params.cost,
+                       lanes=params.parallelism, memory_cost=params.memory)
+    else:
+        raise ValueError(f"不支持的 KDF：{params.algorithm}")
+    return kdf.derive(password)
+
+
+def _measure(params: KdfParams) -> float:
+    start = time.perf_counter()
+    derive_key(b'calibration', bytes(SALT_SIZE), params)
+    return time.perf_counter() - start
+
+
+def calibrate(algorithm: Optional[str] = None,
+              target_seconds: float = DEFAULT_TARGET_SECONDS) -> KdfParams:
+    """测量一次低成本派生的耗时，按比例推算出耗时约为 target_seconds 的参数
+
+    结果不会低于各算法的推荐下限（PBKDF2 10 万次、scrypt N=2^15、Argon2id 3 次 64 MiB）。
+    """
+    if algorithm is None:
+        algorithm = available_algorithms()[0]
+    if algorithm not in available_algorithms():
+        raise ValueError(f"不支持的 KDF：{algorithm}")
+    if target_seconds <= 0:
+        raise ValueError("目标耗时必须大于0")
+
+    if algorithm == 'pbkdf2':
+        probe = KdfParams('pbkdf2', 20000)
+        iterations = int(probe.cost * target_seconds / _measure(probe))
+        return KdfParams('pbkdf2', min(max(iterations, LEGACY_PARAMS.cost), 10_000_000))
+    if algorithm == 'scrypt':
+        # 耗时与 N 成正比，N 只能取 2 的幂
+        probe = KdfParams('scrypt', 14, 8, 1)
+        log_n = probe.cost + round(math.log2(target_seconds / _measure(probe)))
+        return KdfParams('scrypt', min(max(log_n, 15), 20), 8, 1)
+    # Argon2id 固定内存和并行度，按迭代次数调整耗时
+    probe = KdfParams('argon2id', 1, 64 * 1024, 4)
+    iterations = round(target_seconds / _measure(probe))
+    return KdfParams('argon2id', min(max(iterations, 3), 64), probe.memory, probe.parallelism)
+
+
+def pack_header(params: KdfParams, salt: bytes) -> bytes:
+    return _HEADER.pack(_MAGIC, _VERSION, _ALGORITHM_IDS[params.algorithm],
+                        params.cost, params.memory, params.parallelism, salt)
+
+
+def read_header(data: bytes) -> Tuple[KdfParams, bytes]:
+    """解析 pack_header 写入的文件头，返回 (KDF 参数, 盐值)"""
+    if len(data) < _HEADER.size:
+        raise ValueError("加密文件无效")
+    magic, version, algorithm_id, cost, memory, parallelism, salt = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION or algorithm_id not in _ALGORITHM_NAMES:
+        raise ValueError("加密文件无效")
+    params = KdfParams(_ALGORITHM_NAMES[algorithm_id], cost, memory, parallelism)
+    validate_params(params)
+    return params, salt
+
+
+def unpack_header(data: bytes) -> Tuple[KdfParams, bytes, bytes]:
+    """解析主密码文件，返回 (KDF 参数, 盐值, 令牌)；没有文件头的旧格式按 LEGACY_PARAMS 处理"""
+    if data[:len(_MAGIC)] != _MAGIC:
+        return LEGACY_PARAMS, data[:SALT_SIZE], data[SALT_SIZE:]
+    params, salt = read_header(data)
+    return params, salt, data[_HEADER.size:]
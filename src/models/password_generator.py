@@ -1,93 +1,478 @@
+import hashlib
+import math
+import os
 import secrets
 import string
-from typing import List, Set
-from zxcvbn import zxcvbn
+import threading
+from collections import OrderedDict
+from itertools import repeat
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .policy import CLASS_NAMES, PasswordPolicy, TemplateSampler
+from .sampler import CoverageSampler, PassphraseSampler
+from .wordlist import WordList
+
+# 强度评分缓存的最大条目数
+STRENGTH_CACHE_SIZE = 4096
+# score_many 中未命中缓存的密码达到该数量时才使用进程池
+PARALLEL_SCORE_THRESHOLD = 256
+# 生成密码的分析熵值不低于该位数时直接使用分析评分，不再调用zxcvbn
+ANALYTIC_SCORE_THRESHOLD = 60.0
+# 重复或已泄露的密码最多重新生成的轮数
+MAX_REUSE_ATTEMPTS = 10
+
+# 按字符类型估算用户输入密码的字符空间
+_CHARSET_POOLS = (
+    (frozenset(string.ascii_uppercase), 26),
+    (frozenset(string.ascii_lowercase), 26),
+    (frozenset(string.digits), 10),
+    (frozenset(string.punctuation + ' '), 33),
+)
+
+# 超出时间预算后在后台继续计算zxcvbn的线程池
+_background_executor = None
+_background_lock = threading.Lock()
+
+
+def _score_from_guesses_log10(guesses_log10: float) -> int:
+    """按zxcvbn的阈值把猜测次数映射为0-4分"""
+    if guesses_log10 < 3:
+        return 0
+    if guesses_log10 < 6:
+        return 1
+    if guesses_log10 < 8:
+        return 2
+    if guesses_log10 < 10:
+        return 3
+    return 4
+
+
+def _charset_pool_size(password: str) -> int:
+    """按密码中出现的字符类型估算字符空间大小"""
+    pool = 0
+    for chars, size in _CHARSET_POOLS:
+        if not chars.isdisjoint(password):
+            pool += size
+    if pool == 0 and password:
+        # 只包含其他字符（如中文）时按单个类型计
+        pool = 26
+    return pool
+
+
+def _background_pool():
+    global _background_executor
+    with _background_lock:
+        if _background_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='zxcvbn')
+        return _background_executor
+
+
+def _score_password(password: str) -> dict:
+    """使用zxcvbn检查密码强度（模块级函数，供进程池调用）"""
+    # zxcvbn 导入时会构建较大的词频字典，首次使用时才加载
+    from zxcvbn import zxcvbn
+    return zxcvbn(password)
 
 class PasswordGenerator:
-    def __init__(self):
+    def __init__(self,
+                 reuse_checker: Optional[Callable[[Sequence[str]], List[bool]]] = None,
+                 breach_checker: Optional[Callable[[Sequence[str]], List[bool]]] = None):
         self.uppercase_letters = string.ascii_uppercase
         self.lowercase_letters = string.ascii_lowercase
         self.digits = string.digits
         self.special_chars = '!@#$%^&*'
         
+        # 生成策略 -> 采样器
+        self._samplers: Dict[tuple, Union[CoverageSampler, PassphraseSampler]] = {}
+        # 词表路径 -> 已映射的词表
+        self._wordlists: Dict[str, WordList] = {}
+        
+        # 强度评分的 LRU 缓存，以带密钥的哈希作为键，不保存明文键
+        self._strength_cache: 'OrderedDict[bytes, dict]' = OrderedDict()
+        self._strength_cache_key = secrets.token_bytes(32)
+        self._strength_cache_lock = threading.Lock()
+        
+        # 可选的重复检测：传入一批密码，返回每个密码是否已经生成过，
+        # 如 HistoryManager.find_reused；命中的密码会被重新生成
+        self.reuse_checker = reuse_checker
+        # 可选的泄露检查，接口相同，如 BreachChecker.find_breached
+        self.breach_checker = breach_checker
+        
     def generate_passwords(self, 
                           length: int = 16, 
                           count: int = 3,
                           use_uppercase: bool = True,
                           use_lowercase: bool = True,
                           use_digits: bool = True,
-                          use_special: bool = True) -> List[str]:
+                          use_special: bool = True,
+                          min_counts: Optional[Dict[str, int]] = None,
+                          with_entropy: bool = False,
+                          policy: Optional[PasswordPolicy] = None) -> List[Union[str, Tuple[str, float]]]:
         # 验证参数
-        if length < 12 or length > 64:
-            raise ValueError("密码长度必须在12-64位之间")
         if count < 1 or count > 10:
             raise ValueError("密码数量必须在1-10个之间")
             
-        # 确保至少选择两种字符类型
-        char_types = [use_uppercase, use_lowercase, use_digits, use_special]
-        if sum(char_types) < 2:
-            raise ValueError("至少需要选择两种字符类型")
-            
-        # 构建字符集
-        chars = ''
-        if use_uppercase:
-            chars += self.uppercase_letters
-        if use_lowercase:
-            chars += self.lowercase_letters
-        if use_digits:
-            chars += self.digits
-        if use_special:
-            chars += self.special_chars
+        return self.generate_batch(count, length,
+                                   use_uppercase=use_uppercase,
+                                   use_lowercase=use_lowercase,
+                                   use_digits=use_digits,
+                                   use_special=use_special,
+                                   min_counts=min_counts,
+                                   with_entropy=with_entropy,
+                                   policy=policy)
+    
+    def generate_batch(self,
+                       n: int,
+                       length: int = 16,
+                       use_uppercase: bool = True,
+                       use_lowercase: bool = True,
+                       use_digits: bool = True,
+                       use_special: bool = True,
+                       min_counts: Optional[Dict[str, int]] = None,
+                       with_entropy: bool = False,
+                       policy: Optional[PasswordPolicy] = None) -> List[Union[str, Tuple[str, float]]]:
+        """批量生成密码，不限制数量
+        
+        min_counts 可指定每种字符类型的最少数量，键为
+        'uppercase'、'lowercase'、'digits'、'special'，未指定的已选类型默认至少 1 个。
+        输出在所有满足这些约束的密码中均匀分布，见 CoverageSampler。
+        with_entropy 为 True 时返回 (密码, 熵值) 元组，熵值见 policy_entropy。
+        policy 为预先编译的 PasswordPolicy（自定义特殊字符、排除字符、模板等），
+        指定时忽略 length、use_* 和 min_counts。
+        """
+        if n < 1:
+            raise ValueError("密码数量必须大于0")
             
-        passwords = []
-        for _ in range(count):
-            while True:
-                # 生成密码
-                password = ''.join(secrets.choice(chars) for _ in range(length))
-                # 确保密码包含所有选择的字符类型
-                if self._validate_password(password, use_uppercase, use_lowercase, use_digits, use_special):
-                    passwords.append(password)
-                    break
-                    
+        sampler = self._get_sampler(length, use_uppercase, use_lowercase,
+                                    use_digits, use_special, min_counts, policy)
+        passwords = self._sample(sampler, n)
+        if with_entropy:
+            return list(zip(passwords, repeat(round(sampler.entropy, 2))))
         return passwords
     
-    def _validate_password(self, 
-                          password: str,
-                          use_uppercase: bool,
-                          use_lowercase: bool,
-                          use_digits: bool,
-                          use_special: bool) -> bool:
-        has_upper = any(c in self.uppercase_letters for c in password)
-        has_lower = any(c in self.lowercase_letters for c in password)
-        has_digit = any(c in self.digits for c in password)
-        has_special = any(c in self.special_chars for c in password)
+    def iter_passwords(self,
+                       n: Optional[int] = None,
+                       length: int = 16,
+                       use_uppercase: bool = True,
+                       use_lowercase: bool = True,
+                       use_digits: bool = True,
+                       use_special: bool = True,
+                       min_counts: Optional[Dict[str, int]] = None,
+                       chunk_size: int = 4096,
+                       with_entropy: bool = False,
+                       policy: Optional[PasswordPolicy] = None) -> Iterator[Union[str, Tuple[str, float]]]:
+        """惰性生成密码
+        
+        每次只生成 chunk_size 个密码，内存占用与总数无关；n 为 None 时无限生成。
+        其余参数与 generate_batch 相同。
+        """
+        if n is not None and n < 0:
+            raise ValueError("密码数量不能为负数")
+        if chunk_size < 1:
+            raise ValueError("分块大小必须大于0")
+            
+        # 在第一次迭代前就验证参数
+        sampler = self._get_sampler(length, use_uppercase, use_lowercase,
+                                    use_digits, use_special, min_counts, policy)
+        return self._iter_samples(sampler, n, chunk_size, with_entropy)
+    
+    def _iter_samples(self,
+                      sampler: Union[CoverageSampler, TemplateSampler, PassphraseSampler],
+                      n: Optional[int],
+                      chunk_size: int,
+                      with_entropy: bool = False) -> Iterator[Union[str, Tuple[str, float]]]:
+        entropy = round(sampler.entropy, 2)
+        remaining = n
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            passwords = self._sample(sampler, size)
+            if with_entropy:
+                yield from zip(passwords, repeat(entropy))
+            else:
+                yield from passwords
+            if remaining is not None:
+                remaining -= size
+    
+    def _sample(self,
+                sampler: Union[CoverageSampler, TemplateSampler, PassphraseSampler],
+                n: int) -> List[str]:
+        """生成 n 个密码
+        
+        设置了 reuse_checker 时保证互不相同且未生成过，设置了 breach_checker 时
+        保证不在泄露密码语料库中；不满足的密码重新生成。
+        """
+        passwords = sampler.sample(n)
+        checkers = [checker for checker in (self.reuse_checker, self.breach_checker)
+                    if checker is not None]
+        if not checkers:
+            return passwords
+            
+        accepted: List[str] = []
+        seen = set()
+        for _ in range(MAX_REUSE_ATTEMPTS):
+            rejected = [False] * len(passwords)
+            for checker in checkers:
+                rejected = [a or b for a, b in zip(rejected, checker(passwords))]
+            for password, reject in zip(passwords, rejected):
+                if not reject and password not in seen:
+                    seen.add(password)
+                    accepted.append(password)
+            if len(accepted) == n:
+                return accepted
+            passwords = sampler.sample(n - len(accepted))
+        raise ValueError("无法生成未使用过且未泄露的密码，请增加密码长度或字符类型")
+    
+    def generate_passphrases(self,
+                             wordlist: Union[str, Path, WordList],
+                             count: int = 3,
+                             words: int = 6,
+                             separator: str = '-',
+                             capitalize: str = 'none',
+                             digits: int = 0,
+                             with_entropy: bool = False) -> List[Union[str, Tuple[str, float]]]:
+        """生成 Diceware 口令短语
         
-        if use_uppercase and not has_upper:
-            return False
-        if use_lowercase and not has_lower:
-            return False
-        if use_digits and not has_digit:
-            return False
-        if use_special and not has_special:
-            return False
+        wordlist 为词表路径（文本或编译格式，见 WordList.load）或已打开的 WordList。
+        每个单词从词表中均匀抽取，熵值为 words * log2(词表大小)，
+        随机大写和追加数字会相应增加熵值，见 PassphraseSampler。
+        """
+        if count < 1:
+            raise ValueError("口令短语数量必须大于0")
             
-        return True
+        sampler = self._get_passphrase_sampler(wordlist, words, separator, capitalize, digits)
+        phrases = self._sample(sampler, count)
+        if with_entropy:
+            return list(zip(phrases, repeat(round(sampler.entropy, 2))))
+        return phrases
+    
+    def iter_passphrases(self,
+                         wordlist: Union[str, Path, WordList],
+                         n: Optional[int] = None,
+                         words: int = 6,
+                         separator: str = '-',
+                         capitalize: str = 'none',
+                         digits: int = 0,
+                         chunk_size: int = 4096,
+                         with_entropy: bool = False) -> Iterator[Union[str, Tuple[str, float]]]:
+        """惰性生成口令短语，参数与 generate_passphrases、iter_passwords 相同"""
+        if n is not None and n < 0:
+            raise ValueError("口令短语数量不能为负数")
+        if chunk_size < 1:
+            raise ValueError("分块大小必须大于0")
+            
+        sampler = self._get_passphrase_sampler(wordlist, words, separator, capitalize, digits)
+        return self._iter_samples(sampler, n, chunk_size, with_entropy)
+    
+    def _get_passphrase_sampler(self,
+                                wordlist: Union[str, Path, WordList],
+                                words: int,
+                                separator: str,
+                                capitalize: str,
+                                digits: int) -> PassphraseSampler:
+        """获取（并缓存）口令短语策略对应的采样器"""
+        if not isinstance(wordlist, WordList):
+            path = str(Path(wordlist).resolve())
+            wordlist = self._wordlists.get(path)
+            if wordlist is None:
+                wordlist = self._wordlists[path] = WordList.load(path)
+        key = ('passphrase', str(wordlist.path), words, separator, capitalize, digits)
+        sampler = self._samplers.get(key)
+        if sampler is not None:
+            return sampler
+            
+        # 验证参数
+        if words < 3 or words > 20:
+            raise ValueError("单词数必须在3-20个之间")
+        if digits < 0 or digits > 8:
+            raise ValueError("数字位数必须在0-8位之间")
+            
+        sampler = PassphraseSampler(wordlist, words, separator, capitalize, digits)
+        self._samplers[key] = sampler
+        return sampler
+    
+    def policy_entropy(self,
+                       length: int = 16,
+                       use_uppercase: bool = True,
+                       use_lowercase: bool = True,
+                       use_digits: bool = True,
+                       use_special: bool = True,
+                       min_counts: Optional[Dict[str, int]] = None,
+                       policy: Optional[PasswordPolicy] = None) -> float:
+        """生成策略的熵值（位）
+        
+        等于 log2(满足约束的密码总数)：不考虑类型覆盖约束时即 L * log2(N)，
+        其中 L 是长度、N 是字符集大小，覆盖约束会使其略小。每个策略只计算一次。
+        """
+        sampler = self._get_sampler(length, use_uppercase, use_lowercase,
+                                    use_digits, use_special, min_counts, policy)
+        return round(sampler.entropy, 2)
+    
+    def _get_sampler(self,
+                     length: int,
+                     use_uppercase: bool,
+                     use_lowercase: bool,
+                     use_digits: bool,
+                     use_special: bool,
+                     min_counts: Optional[Dict[str, int]] = None,
+                     policy: Optional[PasswordPolicy] = None) -> Union[CoverageSampler, TemplateSampler]:
+        """获取（并缓存）生成策略对应的采样器，指定 policy 时直接使用其编译好的采样器"""
+        if policy is not None:
+            return policy.sampler
+        min_counts = min_counts or {}
+        key = (length, use_uppercase, use_lowercase, use_digits, use_special,
+               tuple(sorted(min_counts.items())))
+        sampler = self._samplers.get(key)
+        if sampler is not None:
+            return sampler
+            
+        # 由 PasswordPolicy 验证参数并构建字符集
+        selected = (use_uppercase, use_lowercase, use_digits, use_special)
+        sampler = PasswordPolicy(
+            length,
+            classes=[name for name, use in zip(CLASS_NAMES, selected) if use],
+            symbols=self.special_chars,
+            min_counts=min_counts,
+        ).sampler
+        self._samplers[key] = sampler
+        return sampler
     
     def check_password_strength(self, password: str) -> dict:
-        """使用zxcvbn检查密码强度"""
-        return zxcvbn(password)
+        """使用zxcvbn检查密码强度，结果按密码缓存"""
+        key = self._strength_key(password)
+        result = self._cached_strength(key)
+        if result is None:
+            result = _score_password(password)
+            self._store_strength(key, result)
+        return result
+    
+    def score_many(self,
+                   passwords: Iterable[str],
+                   workers: Optional[int] = None) -> List[dict]:
+        """批量检查密码强度，按输入顺序返回结果
+        
+        先查缓存；未命中的密码较多时分发到进程池，workers 默认为 CPU 核数，
+        为 1 时始终在当前进程中计算。
+        """
+        passwords = list(passwords)
+        keys = [self._strength_key(password) for password in passwords]
+        results: List[Optional[dict]] = [self._cached_strength(key) for key in keys]
+        
+        # 同一密码只计算一次
+        pending: Dict[bytes, str] = {}
+        for key, password, result in zip(keys, passwords, results):
+            if result is None:
+                pending[key] = password
+                
+        if pending:
+            workers = workers or os.cpu_count() or 1
+            if workers > 1 and len(pending) >= PARALLEL_SCORE_THRESHOLD:
+                from concurrent.futures import ProcessPoolExecutor
+                chunksize = max(1, len(pending) // (workers * 4))
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    scored = list(executor.map(_score_password, pending.values(), chunksize=chunksize))
+            else:
+                scored = [_score_password(password) for password in pending.values()]
+            computed = dict(zip(pending.keys(), scored))
+            for key, result in computed.items():
+                self._store_strength(key, result)
+            results = [computed[key] if result is None else result
+                       for key, result in zip(keys, results)]
+            
+        return results
+    
+    def estimate_strength(self,
+                          password: str,
+                          generated: bool = False,
+                          use_uppercase: bool = True,
+                          use_lowercase: bool = True,
+                          use_digits: bool = True,
+                          use_special: bool = True,
+                          min_counts: Optional[Dict[str, int]] = None,
+                          threshold: float = ANALYTIC_SCORE_THRESHOLD,
+                          time_budget: Optional[float] = None,
+                          policy: Optional[PasswordPolicy] = None) -> dict:
+        """分级估算密码强度
+        
+        返回 {'score': 0-4, 'guesses_log10': 猜测次数的常用对数, 'tier': 评分来源}，tier 为：
+        - 'analytic'：generated 为 True 时，由生成策略的字符空间直接算出，O(1)；
+          生成策略（字符类型和 min_counts，或 policy）必须与生成该密码时一致
+        - 'zxcvbn'：用户输入的密码，或生成策略的熵值低于 threshold 位
+        - 'charset'：zxcvbn 未能在 time_budget 秒内完成时，按密码包含的字符类型粗略估算；
+          zxcvbn 会在后台继续计算并写入缓存，之后的调用可直接得到 'zxcvbn' 结果
+        """
+        if generated:
+            sampler = self._get_sampler(len(password), use_uppercase, use_lowercase,
+                                        use_digits, use_special, min_counts, policy)
+            guesses_log10 = sampler.entropy * math.log10(2)
+            if sampler.entropy >= threshold:
+                return {
+                    'score': _score_from_guesses_log10(guesses_log10),
+                    'guesses_log10': guesses_log10,
+                    'tier': 'analytic',
+                }
+                
+        key = self._strength_key(password)
+        result = self._cached_strength(key)
+        if result is None:
+            if time_budget is None:
+                result = self.check_password_strength(password)
+            else:
+                from concurrent.futures import TimeoutError
+                future = _background_pool().submit(self.check_password_strength, password)
+                try:
+                    result = future.result(timeout=time_budget)
+                except TimeoutError:
+                    return self._estimate_from_charset(password)
+                    
+        return {
+            'score': result['score'],
+            'guesses_log10': result['guesses_log10'],
+            'tier': 'zxcvbn',
+        }
+    
+    def _estimate_from_charset(self, password: str) -> dict:
+        """按密码中出现的字符类型估算字符空间（上限估计）"""
+        pool = _charset_pool_size(password)
+        guesses_log10 = len(password) * math.log10(pool) if pool else 0.0
+        return {
+            'score': _score_from_guesses_log10(guesses_log10),
+            'guesses_log10': guesses_log10,
+            'tier': 'charset',
+        }
+    
+    def _strength_key(self, password: str) -> bytes:
+        return hashlib.blake2b(password.encode('utf-8'), key=self._strength_cache_key,
+                               digest_size=16).digest()
+    
+    def _cached_strength(self, key: bytes) -> Optional[dict]:
+        with self._strength_cache_lock:
+            result = self._strength_cache.get(key)
+            if result is not None:
+                self._strength_cache.move_to_end(key)
+            return result
+    
+    def _store_strength(self, key: bytes, result: dict):
+        with self._strength_cache_lock:
+            self._strength_cache[key] = result
+            self._strength_cache.move_to_end(key)
+            while len(self._strength_cache) > STRENGTH_CACHE_SIZE:
+                self._strength_cache.popitem(last=False)
     
     def calculate_entropy(self, password: str) -> float:
-        """计算密码熵值"""
-        char_set: Set[str] = set(password)
-        char_space = len(char_set)
+        """估算任意密码的熵值
+        
+        字符空间按密码中出现的字符类型计算（如出现数字则计入全部 10 个数字），
+        而不是密码中不同字符的个数。生成的密码请使用 policy_entropy。
+        """
         password_length = len(password)
+        char_space = _charset_pool_size(password)
         
         if char_space == 0 or password_length == 0:
             return 0.0
             
         # 使用信息熵公式：H = L * log2(N)
         # 其中L是密码长度，N是字符集大小
-        import math
         entropy = password_length * math.log2(char_space)
-        return round(entropy, 2)
\ No newline at end of file
+        return round(entropy, 2)
@@ -0,0 +1,74 @@
+import sys
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Sequence, Union
+
+# 每次写入的行数
+DEFAULT_CHUNK_SIZE = 4096
+
+
+def _chunks(lines: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    """把任意可迭代对象切成固定大小的块"""
+    iterator = iter(lines)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_lines(lines: Iterable[str],
+                stream: BinaryIO,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """按固定大小的块把每行写入二进制流，返回写入的行数
+
+    任意时刻只有一个块驻留在内存中，适合配合 PasswordGenerator.iter_passwords 流式导出。
+    """
+    if chunk_size < 1:
+        raise ValueError("分块大小必须大于0")
+    count = 0
+    for chunk in _chunks(lines, chunk_size):
+        chunk.append('')
+        stream.write('\n'.join(chunk).encode('utf-8'))
+        count += len(chunk) - 1
+    stream.flush()
+    return count
+
+
+def write_to_file(lines: Iterable[str],
+                  file_path: Union[str, Path],
+                  chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  append: bool = False) -> int:
+    """流式写入文件"""
+    with open(file_path, 'ab' if append else 'wb') as f:
+        return write_lines(lines, f, chunk_size)
+
+
+def write_to_stdout(lines: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """流式写入标准输出"""
+    stream = getattr(sys.stdout, 'buffer', sys.stdout)
+    return write_lines(lines, stream, chunk_size)
+
+
+def write_to_pipe(lines: Iterable[str],
+                  command: Sequence[str],
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """启动 command 并把每行流式写入它的标准输入
+
+    命令以非零状态退出时抛出 subprocess.CalledProcessError。
+    """
+    # subprocess 导入较慢，只在需要时加载
+    import subprocess
+
+    process = subprocess.Popen(list(command), stdin=subprocess.PIPE)
+    try:
+        count = write_lines(lines, process.stdin, chunk_size)
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, list(command))
+    return count
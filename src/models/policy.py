@@ -0,0 +1,228 @@
+import json
+import math
+import string
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from .sampler import CoverageSampler, lookup_table, random_chars
+
+# 默认的特殊字符
+DEFAULT_SYMBOLS = '!@#$%^&*'
+# 容易混淆的字符，exclude_ambiguous 时排除
+AMBIGUOUS_CHARS = '0Oo1lI|'
+# 字符类型的名称，顺序即生成时的类型顺序
+CLASS_NAMES = ('uppercase', 'lowercase', 'digits', 'special')
+
+# 模板占位符 -> 字符类型；'*' 表示所有已选类型的并集，'\' 转义下一个字符，'{n}' 重复前一项
+_PLACEHOLDERS = {'A': 'uppercase', 'a': 'lowercase', '9': 'digits', '!': 'special'}
+_ANY = '*'
+# 模板密码的最低熵值（位）：模板不受 12-64 位长度下限的约束，改为限制熵值，
+# 约等于 7 位随机的小写字母和数字；'Aa{3}-9{4}-!{2}' 约为 38 位
+MIN_TEMPLATE_ENTROPY = 36
+
+
+class TemplateSampler:
+    """按固定模板逐位置生成密码
+
+    每个位置对应一个预先计算好的字符集（字面字符的字符集只有一个字符），
+    各位置独立均匀抽取，熵值为各位置 log2(字符集大小) 之和。
+    """
+
+    def __init__(self, positions: Sequence[str]):
+        if not positions:
+            raise ValueError("模板不能为空")
+        self.positions = tuple(positions)
+        self.length = len(self.positions)
+        self.charset = ''.join(sorted(set(''.join(self.positions))))
+        for chars in set(self.positions):
+            # 预先生成查找表，之后的采样不再处理字符集；字面字符直接重复，不需要查找表
+            if len(chars) > 1:
+                lookup_table(chars)
+        self.total = math.prod(len(chars) for chars in self.positions)
+        self.entropy = math.log2(self.total)
+
+    def sample(self, n: int) -> List[str]:
+        """生成 n 个密码：每个位置一次性抽取 n 个字符，再按列拼接"""
+        if n <= 0:
+            return []
+        columns = [chars * n if len(chars) == 1 else random_chars(chars, n)
+                   for chars in self.positions]
+        return [''.join(chars) for chars in zip(*columns)]
+
+
+def _parse_template(template: str, charsets: Dict[str, str]) -> List[str]:
+    """把模板解析为每个位置的字符集"""
+    positions: List[str] = []
+    i = 0
+    while i < len(template):
+        char = template[i]
+        if char == '\\':
+            if i + 1 >= len(template):
+                raise ValueError("模板不能以转义符结尾")
+            positions.append(template[i + 1])
+            i += 2
+        elif char == '{':
+            end = template.find('}', i)
+            count = template[i + 1:end] if end > 0 else ''
+            if not positions or not count.isdigit() or int(count) < 1:
+                raise ValueError(f"无效的重复次数：{template[i:end + 1 if end > 0 else None]}")
+            positions.extend([positions[-1]] * (int(count) - 1))
+            i = end + 1
+        else:
+            if char in _PLACEHOLDERS:
+                name = _PLACEHOLDERS[char]
+                if name not in charsets:
+                    raise ValueError(f"模板使用了未选择的字符类型：{name}")
+                positions.append(charsets[name])
+            elif char == _ANY:
+                positions.append(''.join(charsets.values()))
+            else:
+                positions.append(char)
+            i += 1
+    if len(positions) > 64:
+        raise ValueError("模板生成的密码不能超过64位")
+    if all(len(chars) == 1 for chars in positions):
+        raise ValueError("模板中至少需要一个随机字符")
+    return positions
+
+
+class PasswordPolicy:
+    """密码策略：字符类型、自定义特殊字符、排除字符、最少数量或固定模板
+
+    创建时即完成验证，并把策略编译为采样器（字符集、各位置的查找表、覆盖约束的计数表）；
+    同一个策略对象可以反复用于 PasswordGenerator 的各个生成接口，切换策略不需要重新构建。
+
+    模板语法：A 大写字母，a 小写字母，9 数字，! 特殊字符，* 任意已选字符，
+    {n} 把前一项重复 n 次，\\ 转义下一个字符，其他字符原样保留。
+    例如 'Aaaa-9999-!!' 或 'Aa{3}-9{4}-!{2}'。模板的熵值不能低于 MIN_TEMPLATE_ENTROPY。
+    """
+
+    def __init__(self,
+                 length: int = 16,
+                 classes: Iterable[str] = CLASS_NAMES,
+                 symbols: str = DEFAULT_SYMBOLS,
+                 min_counts: Optional[Dict[str, int]] = None,
+                 exclude: str = '',
+                 exclude_ambiguous: bool = False,
+                 template: Optional[str] = None,
+                 name: Optional[str] = None):
+        self.name = name
+        self.length = length
+        self.classes = tuple(classes)
+        self.symbols = symbols
+        self.min_counts = dict(min_counts or {})
+        self.exclude = exclude + (AMBIGUOUS_CHARS if exclude_ambiguous else '')
+        self.template = template
+
+        unknown = set(self.classes) - set(CLASS_NAMES)
+        if unknown:
+            raise ValueError(f"未知的字符类型：{', '.join(sorted(unknown))}")
+        unknown = set(self.min_counts) - set(CLASS_NAMES)
+        if unknown:
+            raise ValueError(f"未知的字符类型：{', '.join(sorted(unknown))}")
+        if not all(' ' < char < '\x7f' for char in symbols):
+            raise ValueError("特殊字符必须是可打印的 ASCII 字符")
+        if template is not None and self.min_counts:
+            raise ValueError("模板策略不能指定最少数量，各位置的字符类型已由模板确定")
+
+        # 各类型排除字符后的字符集，按 CLASS_NAMES 的顺序
+        sources = {
+            'uppercase': string.ascii_uppercase,
+            'lowercase': string.ascii_lowercase,
+            'digits': string.digits,
+            'special': ''.join(dict.fromkeys(symbols)),
+        }
+        excluded = set(self.exclude)
+        self.charsets: Dict[str, str] = {}
+        for class_name in CLASS_NAMES:
+            if class_name not in self.classes:
+                continue
+            chars = ''.join(char for char in sources[class_name] if char not in excluded)
+            if not chars:
+                raise ValueError(f"字符类型排除字符后为空：{class_name}")
+            self.charsets[class_name] = chars
+        # 特殊字符与字母、数字重叠时覆盖约束的计数不再成立
+        if 'special' in self.charsets and set(self.charsets['special']) & set(
+                string.ascii_letters + string.digits):
+            raise ValueError("特殊字符中不能包含字母或数字")
+
+        self.sampler = self._compile()
+        # 模板策略的长度由模板决定
+        self.length = self.sampler.length
+
+    def _compile(self) -> Union[CoverageSampler, TemplateSampler]:
+        if self.template is not None:
+            if not self.charsets:
+                raise ValueError("至少需要选择一种字符类型")
+            sampler = TemplateSampler(_parse_template(self.template, self.charsets))
+            if sampler.entropy < MIN_TEMPLATE_ENTROPY:
+                raise ValueError(f"模板的熵值过低：{sampler.entropy:.1f} 位，至少需要 {MIN_TEMPLATE_ENTROPY} 位")
+            return sampler
+
+        if self.length < 12 or self.length > 64:
+            raise ValueError("密码长度必须在12-64位之间")
+        if len(self.charsets) < 2:
+            raise ValueError("至少需要选择两种字符类型")
+        minimums = []
+        for class_name in CLASS_NAMES:
+            minimum = self.min_counts.get(class_name, 1 if class_name in self.charsets else 0)
+            if minimum < 0:
+                raise ValueError("字符类型的最少数量不能为负数")
+            if class_name not in self.charsets:
+                if minimum > 0:
+                    raise ValueError(f"未选择的字符类型不能指定最少数量：{class_name}")
+                continue
+            minimums.append(minimum)
+        return CoverageSampler(list(self.charsets.values()), minimums, self.length)
+
+    @property
+    def entropy(self) -> float:
+        """策略的熵值（位），等于 log2(可能生成的密码总数)"""
+        return self.sampler.entropy
+
+    @classmethod
+    def from_dict(cls, spec: Dict, name: Optional[str] = None) -> 'PasswordPolicy':
+        """从配置字典创建，键与构造参数相同
+
+        配置通常来自用户编写的 JSON，类型不符时抛出 ValueError 而不是 TypeError。
+        """
+        label = f"策略 {name} " if name is not None else "策略"
+        if not isinstance(spec, dict):
+            raise ValueError(f"{label}的配置必须是对象")
+        unknown = set(spec) - set(_SPEC_TYPES)
+        if unknown:
+            raise ValueError(f"未知的策略配置项：{', '.join(sorted(unknown))}")
+        for key, value in spec.items():
+            if not _SPEC_TYPES[key](value):
+                raise ValueError(f"{label}的配置项 {key} 类型无效：{value!r}")
+        return cls(name=name, **spec)
+
+
+def _is_int(value) -> bool:
+    # bool 是 int 的子类，但 true/false 不是有效的长度或数量
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# 策略配置项 -> 类型检查
+_SPEC_TYPES = {
+    'length': _is_int,
+    'classes': lambda value: isinstance(value, list) and all(isinstance(item, str) for item in value),
+    'symbols': lambda value: isinstance(value, str),
+    'min_counts': lambda value: isinstance(value, dict) and all(
+        isinstance(key, str) and _is_int(count) for key, count in value.items()),
+    'exclude': lambda value: isinstance(value, str),
+    'exclude_ambiguous': lambda value: isinstance(value, bool),
+    'template': lambda value: value is None or isinstance(value, str),
+}
+
+
+def load_policies(path: Union[str, Path]) -> Dict[str, PasswordPolicy]:
+    """从 JSON 文件读取一组命名策略：{"名称": {策略配置}, ...}
+
+    所有策略在读取时一次性编译，之后按名称取用。
+    """
+    with open(path, encoding='utf-8') as f:
+        specs = json.load(f)
+    if not isinstance(specs, dict):
+        raise ValueError("策略文件必须是以策略名称为键的对象")
+    return {name: PasswordPolicy.from_dict(spec, name) for name, spec in specs.items()}
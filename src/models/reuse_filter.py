@@ -0,0 +1,107 @@
+import math
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+# 文件头：魔数、版本、哈希函数个数、位数、容量、已加入条数、已同步的指纹 id、所属数据库标记
+_HEADER = struct.Struct('<4sBBxxQQQQ8s')
+_MAGIC = b'PGBF'
+_VERSION = 1
+
+# 默认误判率：约 9.6 位（1.2 字节）/ 条
+DEFAULT_ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    """布隆过滤器，元素为至少 16 字节的均匀哈希值（如带密钥的 BLAKE2b 摘要）
+
+    不会漏报；误判率在加入的条数不超过 capacity 时约为 error_rate。
+    每次查询只检查 hashes 个位，与条数无关。
+    """
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        if capacity < 1:
+            raise ValueError("容量必须大于0")
+        if not 0 < error_rate < 1:
+            raise ValueError("误判率必须在0-1之间")
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        # 已加入过滤器的最大指纹 id 和所属数据库的标记，由调用方维护，随文件一起保存
+        self.synced_id = 0
+        self.tag = bytes(8)
+
+    def add(self, digest: bytes):
+        # 双重哈希：第 i 个位置为 h1 + i * h2
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        bits = self.bits
+        size = self.size
+        for _ in range(self.hashes):
+            position = h1 % size
+            bits[position >> 3] |= 1 << (position & 7)
+            h1 += h2
+        self.count += 1
+
+    def add_many(self, digests: Iterable[bytes]):
+        for digest in digests:
+            self.add(digest)
+
+    def __contains__(self, digest: bytes) -> bool:
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        bits = self.bits
+        size = self.size
+        for _ in range(self.hashes):
+            position = h1 % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            h1 += h2
+        return True
+
+    def save(self, path: Union[str, Path]):
+        """写入文件（先写临时文件再替换，中途退出不会留下损坏的文件）
+
+        临时文件名各不相同：界面和命令行可能同时保存同一个过滤器，
+        共用一个临时文件时两边的写入会交错，文件头与位数组不再对应。
+        """
+        path = Path(path)
+        fd, temp_name = tempfile.mkstemp(prefix=path.name + '.', suffix='.tmp', dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION, self.hashes, self.size, self.capacity,
+                                     self.count, self.synced_id, self.tag))
+                f.write(self.bits)
+            os.replace(temp_name, path)
+        except BaseException:
+            try:
+                os.unlink(temp_name)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional['BloomFilter']:
+        """从文件读取，文件不存在或格式不符时返回 None"""
+        try:
+            data = Path(path).read_bytes()
+        except OSError:
+            return None
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, hashes, size, capacity, count, synced_id, tag = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION or len(data) != _HEADER.size + (size + 7) // 8:
+            return None
+        bloom = cls.__new__(cls)
+        bloom.capacity = capacity
+        bloom.size = size
+        bloom.hashes = hashes
+        bloom.bits = bytearray(data[_HEADER.size:])
+        bloom.count = count
+        bloom.synced_id = synced_id
+        bloom.tag = tag
+        return bloom
@@ -0,0 +1,289 @@
+import bisect
+import math
+import os
+import secrets
+import threading
+from functools import lru_cache
+from math import comb
+from typing import List, Sequence, Tuple
+
+# 每次从系统随机源读取的最大字节数
+RANDOM_CHUNK_SIZE = 64 * 1024
+
+
+class RandomPool:
+    """缓冲的系统随机字节，用于快速抽取随机整数
+
+    每个线程各自持有一个实例（见 random_pool），字节只使用一次。
+    """
+
+    def __init__(self):
+        self._buf = b''
+        self._pos = 0
+
+    def take(self, size: int) -> bytes:
+        """取出 size 个随机字节"""
+        if self._pos + size > len(self._buf):
+            self._buf = secrets.token_bytes(max(RANDOM_CHUNK_SIZE, size))
+            self._pos = 0
+        data = self._buf[self._pos:self._pos + size]
+        self._pos += size
+        return data
+
+    def randbelow(self, n: int) -> int:
+        """返回 [0, n) 内均匀分布的整数（按位掩码拒绝采样）"""
+        bits = n.bit_length()
+        size = (bits + 7) // 8
+        mask = (1 << bits) - 1
+        while True:
+            value = int.from_bytes(self.take(size), 'little') & mask
+            if value < n:
+                return value
+
+    def shuffle(self, items: list):
+        """Fisher-Yates 洗牌，每种排列概率相同
+
+        每一步单独抽取 [0, i] 内的交换位置，避免 [0, n!) 的大整数运算。
+        """
+        for i in range(len(items) - 1, 0, -1):
+            j = self.randbelow(i + 1)
+            items[i], items[j] = items[j], items[i]
+
+
+_local = threading.local()
+
+
+def _reset_pools():
+    # fork 后子进程不能复用父进程缓冲中的随机字节
+    global _local
+    _local = threading.local()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pools)
+
+
+def random_pool() -> RandomPool:
+    """获取当前线程的随机字节池"""
+    pool = getattr(_local, 'pool', None)
+    if pool is None:
+        pool = _local.pool = RandomPool()
+    return pool
+
+
+@lru_cache(maxsize=256)
+def lookup_table(chars: str) -> Tuple[bytes, bytes, int]:
+    """获取字符集对应的字节查找表 (映射表, 需要丢弃的字节, 上限)"""
+    size = len(chars)
+    if size == 0 or size > 256:
+        raise ValueError("字符集大小必须在1-256之间")
+    # 只保留 [0, limit) 范围内的字节，保证每个字符概率相同
+    limit = 256 - 256 % size
+    table = bytes(ord(chars[b % size]) for b in range(256))
+    delete = bytes(range(limit, 256))
+    return table, delete, limit
+
+
+def _random_bytes(chars: str, count: int) -> bytes:
+    table, delete, limit = lookup_table(chars)
+    parts = []
+    remaining = count
+    while remaining > 0:
+        # 按拒绝率估算需要读取的字节数
+        size = min(RANDOM_CHUNK_SIZE, remaining * 256 // limit + 16)
+        data = secrets.token_bytes(size).translate(table, delete)
+        parts.append(data[:remaining])
+        remaining -= len(parts[-1])
+    return b''.join(parts)
+
+
+def random_chars(chars: str, count: int) -> str:
+    """从字符集中无偏地随机抽取 count 个字符
+
+    随机字节按块读取，通过查找表映射到字符集，
+    超出无偏范围的字节直接丢弃（拒绝采样），避免逐字符调用 secrets.choice。
+    """
+    return _random_bytes(chars, count).decode('ascii')
+
+
+# 码位 0-255 的字符，前 n 个作为 random_indices 的“字符集”
+_INDEX_CHARS = ''.join(map(chr, range(256)))
+
+
+def random_indices(bound: int, count: int) -> bytes:
+    """无偏地抽取 count 个 [0, bound) 内的整数（bound 不超过 256），每个字节一个"""
+    return _random_bytes(_INDEX_CHARS[:bound], count)
+
+
+class CoverageSampler:
+    """按构造保证字符类型覆盖的密码采样器
+
+    输出在所有“每种字符类型至少出现 min_counts[i] 次”的密码中均匀分布：
+    先按精确计数的权重抽取各类型的字符数量，再在各类型内均匀抽取字符，
+    最后做一次无偏洗牌。每个密码的开销固定，不需要重试。
+    各字符类型的字符集必须互不相交。
+    """
+
+    def __init__(self, charsets: Sequence[str], min_counts: Sequence[int], length: int):
+        if len(charsets) != len(min_counts):
+            raise ValueError("字符集与最少数量不匹配")
+        if sum(min_counts) > length:
+            raise ValueError("各类型最少字符数之和不能超过密码长度")
+        if length > 256:
+            raise ValueError("密码长度不能超过256位")
+        self.charsets = tuple(charsets)
+        self.min_counts = tuple(min_counts)
+        self.length = length
+        self.charset = ''.join(self.charsets)
+
+        # ways[i][r]：用第 i 类及之后的类型组成长度为 r 且满足最少数量的字符串数
+        m = len(self.charsets)
+        ways = [[0] * (length + 1) for _ in range(m + 1)]
+        ways[m][0] = 1
+        # cumulative[i][r]：第 i 类取 min_counts[i], min_counts[i]+1, ... 个字符时的累计权重
+        cumulative: List[List[List[int]]] = [[[] for _ in range(length + 1)] for _ in range(m)]
+        # divisors[i][r]：对应的 C(r, k) * |第 i 类|^k，用于解码后续类型的随机数
+        divisors: List[List[List[int]]] = [[[] for _ in range(length + 1)] for _ in range(m)]
+        for i in range(m - 1, -1, -1):
+            size = len(self.charsets[i])
+            for r in range(length + 1):
+                total = 0
+                acc = cumulative[i][r]
+                div = divisors[i][r]
+                for k in range(self.min_counts[i], r + 1):
+                    arrangements = comb(r, k) * size ** k
+                    total += arrangements * ways[i + 1][r - k]
+                    acc.append(total)
+                    div.append(arrangements)
+                ways[i][r] = total
+        self._ways = ways
+        self._cumulative = cumulative
+        self._divisors = divisors
+
+        # 满足约束的密码总数，以及均匀采样时的熵值（位）
+        self.total = ways[0][length]
+        self.entropy = math.log2(self.total)
+        # Fisher-Yates 洗牌依次交换的位置
+        self._shuffle_steps = tuple(range(length - 1, 0, -1))
+
+    def composition(self, u: int) -> Tuple[int, ...]:
+        """把 [0, total) 内的均匀随机数解码为每种字符类型的数量
+
+        第 i 类取 k 个字符的概率与满足约束、且恰好含 k 个该类字符的密码数成正比。
+        """
+        counts = []
+        remaining = self.length
+        for i in range(len(self.charsets) - 1):
+            acc = self._cumulative[i][remaining]
+            j = bisect.bisect_right(acc, u)
+            # 剩余部分在后续类型的组合数内仍然均匀分布
+            if j:
+                u -= acc[j - 1]
+            u //= self._divisors[i][remaining][j]
+            k = self.min_counts[i] + j
+            counts.append(k)
+            remaining -= k
+        counts.append(remaining)
+        return tuple(counts)
+
+    def sample(self, n: int) -> List[str]:
+        """生成 n 个密码
+
+        各类型数量由一个 [0, total) 内的随机数决定；洗牌每一步的交换位置
+        按步一次性为所有密码抽取，不再需要 [0, total * length!) 的大整数运算。
+        """
+        pool = random_pool()
+        total = self.total
+        compositions = [self.composition(pool.randbelow(total)) for _ in range(n)]
+
+        # 每种字符类型的字符一次性批量抽取
+        streams = []
+        for i, chars in enumerate(self.charsets):
+            streams.append(random_chars(chars, sum(c[i] for c in compositions)))
+        offsets = [0] * len(streams)
+
+        classes = range(len(streams))
+        steps = self._shuffle_steps
+        # 第 i 步的交换位置在 [0, i] 内均匀，各步、各密码相互独立
+        swaps = zip(*[random_indices(i + 1, n) for i in steps]) if steps else [()] * n
+        passwords = []
+        for counts, swap in zip(compositions, swaps):
+            parts = []
+            for i in classes:
+                start = offsets[i]
+                end = offsets[i] = start + counts[i]
+                parts.append(streams[i][start:end])
+            chars = list(''.join(parts))
+            for i, j in zip(steps, swap):
+                chars[i], chars[j] = chars[j], chars[i]
+            passwords.append(''.join(chars))
+        return passwords
+
+
+class PassphraseSampler:
+    """从词表中均匀抽取单词组成口令短语（Diceware）
+
+    capitalize 为 'none'（保持原样）、'first'（每个单词首字母大写）或
+    'random'（每个单词独立随机决定是否首字母大写）；digits 大于 0 时
+    在随机一个单词后追加 digits 位随机数字。每个口令短语只抽取一个随机数，
+    各部分按混合进制从中逐位取出。熵值假设词表中的单词互不相同、不含数字且为小写。
+    """
+
+    CAPITALIZE_MODES = ('none', 'first', 'random')
+
+    def __init__(self,
+                 wordlist: Sequence[str],
+                 words: int,
+                 separator: str = '-',
+                 capitalize: str = 'none',
+                 digits: int = 0):
+        if capitalize not in self.CAPITALIZE_MODES:
+            raise ValueError(f"未知的大写方式：{capitalize}")
+        if words < 1:
+            raise ValueError("单词数必须大于0")
+        if digits < 0:
+            raise ValueError("数字位数不能为负数")
+        self.wordlist = wordlist
+        self.words = words
+        self.separator = separator
+        self.capitalize = capitalize
+        self.digits = digits
+
+        # 所有可能的口令短语数，以及均匀采样时的熵值（位）
+        total = len(wordlist) ** words
+        if capitalize == 'random':
+            total <<= words
+        if digits:
+            total *= words * 10 ** digits
+        self.total = total
+        self.entropy = math.log2(total)
+
+    def sample(self, n: int) -> List[str]:
+        """生成 n 个口令短语"""
+        pool = random_pool()
+        wordlist = self.wordlist
+        size = len(wordlist)
+        words = range(self.words)
+        random_case = self.capitalize == 'random'
+        first_upper = self.capitalize == 'first'
+        digits = self.digits
+        phrases = []
+        for _ in range(n):
+            r = pool.randbelow(self.total)
+            parts = []
+            for _ in words:
+                r, index = divmod(r, size)
+                parts.append(wordlist[index])
+            if random_case:
+                r, mask = divmod(r, 1 << self.words)
+                for i in words:
+                    if mask >> i & 1:
+                        parts[i] = parts[i][:1].upper() + parts[i][1:]
+            elif first_upper:
+                parts = [part[:1].upper() + part[1:] for part in parts]
+            if digits:
+                # 剩余部分恰好在 [0, 单词数 * 10^digits) 内
+                number, position = divmod(r, self.words)
+                parts[position] += f"{number:0{digits}d}"
+            phrases.append(self.separator.join(parts))
+        return phrases
@@ -0,0 +1,284 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .codec import CiphertextCodec
+from .kdf import HEADER_SIZE as KDF_HEADER_SIZE, KdfParams, pack_header, read_header
+
+# 保管库文件头：魔数、版本、当前索引的位置和长度，之后是 KDF 文件头（参数和盐值）
+_HEADER = struct.Struct('<4sBxxxQQ')
+_MAGIC = b'PGVT'
+_VERSION = 1
+# 第一条记录的位置
+DATA_START = _HEADER.size + KDF_HEADER_SIZE
+# 记录明文开头的名称长度
+_NAME_LENGTH = struct.Struct('<H')
+# 索引明文：条数，之后是各条记录的 8 字节位置、4 字节长度和以 NUL 分隔的名称
+_INDEX_COUNT = struct.Struct('<I')
+
+
+def _pack_index(names: Dict[str, int], offsets: array, lengths: array) -> bytes:
+    """names 为名称 -> 槽位，只写入仍在使用的槽位"""
+    slots = list(names.values())
+    offsets = array('Q', [offsets[slot] for slot in slots])
+    lengths = array('I', [lengths[slot] for slot in slots])
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+        lengths.byteswap()
+    return (_INDEX_COUNT.pack(len(slots)) + offsets.tobytes() + lengths.tobytes()
+            + '\0'.join(names).encode())
+
+
+def _unpack_index(data: bytes) -> Tuple[Dict[str, int], array, array]:
+    """返回 (名称 -> 槽位, 各槽位的记录位置, 各槽位的记录长度)
+
+    位置和长度保存在数组中，不为每条记录创建元组；整个解析只用数组和 split。
+    """
+    (count,) = _INDEX_COUNT.unpack_from(data)
+    offsets_end = _INDEX_COUNT.size + count * 8
+    lengths_end = offsets_end + count * 4
+    offsets = array('Q', data[_INDEX_COUNT.size:offsets_end])
+    lengths = array('I', data[offsets_end:lengths_end])
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+        lengths.byteswap()
+    names = data[lengths_end:].decode().split('\0') if count else []
+    if len(names) != count or len(lengths) != count:
+        raise ValueError("保管库索引无效")
+    return dict(zip(names, range(count))), offsets, lengths
+
+
+class Vault:
+    """单文件保管库：一个文件保存多条加密的秘密
+
+    文件由文件头、逐条加密的记录和加密的索引（名称 -> 记录位置、长度）组成。
+    新记录和新索引都追加在文件末尾，最后才改写定长的文件头指向新索引，
+    写入中途退出时文件头仍指向旧索引，已有数据不受影响。
+    读取单条记录时按索引直接在 mmap 中取出对应的一段再解密，与记录总数无关。
+    删除和覆盖留下的旧记录、旧索引由 compact 回收。
+
+    通过 EncryptionManager.open_vault 打开，打开时只派生一次密钥、读取一次索引。
+    """
+
+    def __init__(self, path: Union[str, Path], codec: CiphertextCodec):
+        self.path = Path(path)
+        self._codec = codec
+        self._lock = threading.RLock()
+        self._file = open(self.path, 'r+b', buffering=0)
+        self._mm: Optional[mmap.mmap] = None
+        self._dirty = False
+        try:
+            header = self._file.read(DATA_START)
+            if len(header) < DATA_START:
+                raise ValueError("保管库文件无效")
+            magic, version, index_offset, index_length = _HEADER.unpack_from(header)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError("保管库文件无效")
+            self._kdf_header = header[_HEADER.size:]
+            self._size = self._file.seek(0, 2)
+            # 名称 -> 槽位；覆盖时追加新槽位，旧槽位留到 compact 时丢弃
+            self._names: Dict[str, int] = {}
+            self._offsets = array('Q')
+            self._lengths = array('I')
+            self._index_length = index_length
+            if index_length:
+                if index_offset + index_length > self._size:
+                    raise ValueError("保管库文件无效")
+                self._remap()
+                try:
+                    data = self._codec.decrypt(self._mm[index_offset:index_offset + index_length])
+                except ValueError:
+                    raise ValueError("主密码错误或保管库已损坏")
+                self._names, self._offsets, self._lengths = _unpack_index(data)
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def create(cls, path: Union[str, Path], codec: CiphertextCodec, params: KdfParams, salt: bytes) -> 'Vault':
+        """创建空保管库（已存在的文件会被覆盖）"""
+        path = Path(path)
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, 0, 0))
+            f.write(pack_header(params, salt))
+            f.flush()
+            os.fsync(f.fileno())
+        return cls(path, codec)
+
+    @staticmethod
+    def read_kdf(path: Union[str, Path]) -> Tuple[KdfParams, bytes]:
+        """读取保管库的 KDF 参数和盐值，用于在打开前派生密钥"""
+        with open(path, 'rb') as f:
+            header = f.read(DATA_START)
+        if len(header) < DATA_START or header[:len(_MAGIC)] != _MAGIC:
+            raise ValueError("保管库文件无效")
+        return read_header(header[_HEADER.size:])
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self.flush()
+            finally:
+                if self._mm is not None:
+                    self._mm.close()
+                    self._mm = None
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def _remap(self):
+        # 映射的长度在建立时固定，文件变长后需要重新映射才能读到新记录
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _append(self, data: bytes) -> int:
+        offset = self._size
+        self._file.seek(offset)
+        self._file.write(data)
+        self._size += len(data)
+        return offset
+
+    def get(self, name: str) -> Optional[str]:
+        """读取一条秘密，名称不存在时返回 None"""
+        with self._lock:
+            slot = self._names.get(name)
+            if slot is None:
+                return None
+            offset = self._offsets[slot]
+            length = self._lengths[slot]
+            if self._mm is None or offset + length > len(self._mm):
+                self._remap()
+            token = self._mm[offset:offset + length]
+        try:
+            data = self._codec.decrypt(token)
+        except ValueError:
+            raise ValueError("保管库记录已损坏")
+        (name_length,) = _NAME_LENGTH.unpack_from(data)
+        # 记录中带有名称，防止记录与索引的对应关系被调换
+        if data[_NAME_LENGTH.size:_NAME_LENGTH.size + name_length].decode() != name:
+            raise ValueError("保管库记录与索引不一致")
+        return data[_NAME_LENGTH.size + name_length:].decode()
+
+    def put(self, name: str, secret: str):
+        """写入或覆盖一条秘密；新索引在 flush 或 close 时写入"""
+        self.put_many([(name, secret)])
+
+    def put_many(self, items: Iterable[Tuple[str, str]]):
+        """批量写入，所有记录一次追加到文件末尾"""
+        records = []
+        for name, secret in items:
+            encoded_name = name.encode()
+            if not encoded_name or len(encoded_name) > 0xFFFF or '\0' in name:
+                raise ValueError("名称不能为空或包含 NUL 字符，且不能超过65535字节")
+            token = self._codec.encrypt(_NAME_LENGTH.pack(len(encoded_name)) + encoded_name + secret.encode())
+            records.append((name, token))
+        if not records:
+            return
+        with self._lock:
+            offset = self._append(b''.join(token for _, token in records))
+            for name, token in records:
+                self._names[name] = len(self._offsets)
+                self._offsets.append(offset)
+                self._lengths.append(len(token))
+                offset += len(token)
+            self._dirty = True
+
+    def delete(self, name: str) -> bool:
+        """从索引中删除一条秘密，占用的空间由 compact 回收"""
+        with self._lock:
+            if self._names.pop(name, None) is None:
+                return False
+            self._dirty = True
+            return True
+
+    def flush(self):
+        """追加新索引并更新文件头；先同步数据和索引，再改写文件头"""
+        with self._lock:
+            if not self._dirty:
+                return
+            index_token = self._codec.encrypt(_pack_index(self._names, self._offsets, self._lengths))
+            index_offset = self._append(index_token)
+            os.fsync(self._file.fileno())
+            self._file.seek(0)
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION, index_offset, len(index_token)))
+            os.fsync(self._file.fileno())
+            self._index_length = len(index_token)
+            self._dirty = False
+
+    @property
+    def garbage_bytes(self) -> int:
+        """被删除、覆盖的记录和旧索引占用的字节数，compact 后为 0"""
+        with self._lock:
+            lengths = self._lengths
+            live = sum(lengths[slot] for slot in self._names.values())
+            return self._size - DATA_START - live - (0 if self._dirty else self._index_length)
+
+    def compact(self, migrate: bool = False):
+        """只复制仍在索引中的记录到新文件，再替换原文件
+
+        记录默认按原样复制，不需要重新加密；migrate 为 True 时
+        逐条把旧格式（Fernet 令牌）的记录重新加密为当前的二进制格式。
+        """
+        with self._lock:
+            self.flush()
+            if self._mm is None or len(self._mm) < self._size:
+                self._remap()
+            temp_path = self.path.with_name(self.path.name + '.tmp')
+            names: Dict[str, int] = {}
+            offsets = array('Q')
+            lengths = array('I')
+            with open(temp_path, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION, 0, 0))
+                f.write(self._kdf_header)
+                position = DATA_START
+                # 按原位置顺序复制，顺序读取映射
+                entries = sorted(self._names.items(), key=lambda item: self._offsets[item[1]])
+                records = (self._mm[self._offsets[slot]:self._offsets[slot] + self._lengths[slot]]
+                           for _, slot in entries)
+                if migrate:
+                    records = self._codec.migrate(records)
+                for (name, _), record in zip(entries, records):
+                    f.write(record)
+                    length = len(record)
+                    names[name] = len(offsets)
+                    offsets.append(position)
+                    lengths.append(length)
+                    position += length
+                index_token = self._codec.encrypt(_pack_index(names, offsets, lengths))
+                f.write(index_token)
+                f.seek(0)
+                f.write(_HEADER.pack(_MAGIC, _VERSION, position, len(index_token)))
+                f.flush()
+                os.fsync(f.fileno())
+            self._mm.close()
+            self._mm = None
+            self._file.close()
+            temp_path.replace(self.path)
+            self._file = open(self.path, 'r+b', buffering=0)
+            self._size = position + len(index_token)
+            self._names = names
+            self._offsets = offsets
+            self._lengths = lengths
+            self._index_length = len(index_token)
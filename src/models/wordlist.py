@@ -0,0 +1,123 @@
+import hashlib
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+# 编译后的词表：魔数、版本、单词数、字符串区字节数，
+# 之后是 count + 1 个 4 字节偏移量和所有单词的 UTF-8 拼接
+_HEADER = struct.Struct('<4sBxxxII')
+_MAGIC = b'PGWL'
+_VERSION = 1
+# 编译后词表的文件扩展名
+COMPILED_SUFFIX = '.pgw'
+
+
+def parse_wordlist(lines: Iterable[str]) -> List[str]:
+    """解析文本词表：每行一个单词，或 EFF/Diceware 格式的“骰子编号<空白>单词”
+
+    忽略空行和 # 开头的注释，重复的单词只保留第一次出现（熵值按不重复的单词数计算）。
+    """
+    words = []
+    seen = set()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split()
+        word = parts[-1] if len(parts) > 1 and parts[0].isdigit() else line
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def compile_wordlist(words: List[str], path: Union[str, Path]) -> Path:
+    """把单词列表写成编译格式，返回文件路径"""
+    if len(words) < 2:
+        raise ValueError("词表至少需要2个单词")
+    encoded = [word.encode('utf-8') for word in words]
+    offsets = array('I', [0])
+    position = 0
+    for data in encoded:
+        position += len(data)
+        offsets.append(position)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+
+    path = Path(path)
+    temp_path = path.with_name(path.name + '.tmp')
+    with open(temp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(encoded), position))
+        f.write(offsets.tobytes())
+        f.write(b''.join(encoded))
+    temp_path.replace(path)
+    return path
+
+
+class WordList:
+    """编译格式的只读词表
+
+    文件通过 mmap 映射，偏移量数组经 memoryview 直接读取，打开时不解析、不复制；
+    按下标取单词时才解码对应的一小段 UTF-8。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < _HEADER.size:
+            self._mm.close()
+            raise ValueError("词表文件无效")
+        magic, version, count, blob_size = _HEADER.unpack_from(self._mm)
+        offsets_end = _HEADER.size + (count + 1) * 4
+        if magic != _MAGIC or version != _VERSION or len(self._mm) != offsets_end + blob_size:
+            self._mm.close()
+            raise ValueError("词表文件无效")
+        if sys.byteorder == 'little':
+            self._offsets = memoryview(self._mm)[_HEADER.size:offsets_end].cast('I')
+        else:
+            self._offsets = array('I', self._mm[_HEADER.size:offsets_end])
+            self._offsets.byteswap()
+        self._blob_start = offsets_end
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < self._count:
+            raise IndexError("单词下标超出范围")
+        start = self._blob_start + self._offsets[index]
+        end = self._blob_start + self._offsets[index + 1]
+        return self._mm[start:end].decode('utf-8')
+
+    def close(self):
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._mm.close()
+
+    @classmethod
+    def load(cls, path: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None) -> 'WordList':
+        """打开词表；文本词表在第一次使用时编译并缓存，之后直接映射编译结果
+
+        编译结果保存在 cache_dir（默认 ~/.password_generator/wordlists）中，
+        文本词表修改后会自动重新编译。
+        """
+        path = Path(path)
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) == _MAGIC:
+                return cls(path)
+        if cache_dir is None:
+            cache_dir = Path.home() / '.password_generator' / 'wordlists'
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # 以源文件的绝对路径区分同名词表
+        digest = hashlib.blake2b(str(path.resolve()).encode('utf-8'), digest_size=6).hexdigest()
+        compiled = cache_dir / f"{path.stem}-{digest}{COMPILED_SUFFIX}"
+        if not compiled.exists() or compiled.stat().st_mtime < path.stat().st_mtime:
+            with open(path, encoding='utf-8') as f:
+                compile_wordlist(parse_wordlist(f), compiled)
+        return cls(compiled)
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+# 尽早导入本模块，以它的导入时间作为计时起点
+_START = time.perf_counter()
+
+# 设置环境变量 PASSWORD_GENERATOR_STARTUP_TIMING=1 或传入 --startup-timing 开启
+ENABLED = (os.environ.get('PASSWORD_GENERATOR_STARTUP_TIMING') == '1'
+           or '--startup-timing' in sys.argv)
+
+_marks: List[Tuple[str, float]] = []
+
+
+def mark(name: str):
+    """记录一个启动阶段的结束时间"""
+    if ENABLED:
+        _marks.append((name, time.perf_counter()))
+
+
+def report() -> str:
+    """生成各阶段耗时报告，并输出到标准错误和数据目录下的 startup_timing.log"""
+    lines = ["启动耗时（自进程入口起）："]
+    previous = _START
+    for name, timestamp in _marks:
+        lines.append(f"  {name}：{(timestamp - previous) * 1000:.1f} ms"
+                     f"（累计 {(timestamp - _START) * 1000:.1f} ms）")
+        previous = timestamp
+    text = '\n'.join(lines)
+
+    # 打包后的窗口程序没有标准错误，同时写入日志文件
+    if sys.stderr is not None:
+        print(text, file=sys.stderr)
+    try:
+        data_dir = Path.home() / '.password_generator'
+        data_dir.mkdir(exist_ok=True)
+        with open(data_dir / 'startup_timing.log', 'a', encoding='utf-8') as f:
+            f.write(text + '\n')
+    except OSError:
+        pass
+    return text
+
+
+def report_after_first_paint(widget):
+    """在 widget 第一次绘制完成后记录“首次绘制”并输出报告"""
+    if not ENABLED:
+        return
+    from PySide6.QtCore import QEvent, QObject, QTimer
+
+    class _FirstPaintFilter(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint:
+                obj.removeEventFilter(self)
+                # 等本次绘制事件处理完成后再计时
+                QTimer.singleShot(0, self._finish)
+            return False
+
+        def _finish(self):
+            mark("首次绘制")
+            report()
+
+    widget._startup_paint_filter = _FirstPaintFilter(widget)
+    widget.installEventFilter(widget._startup_paint_filter)
@@ -0,0 +1,116 @@
+import threading
+from typing import Dict, List
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from ..models.password_generator import PasswordGenerator
+
+# 每生成多少个密码向界面发送一次结果
+CHUNK_SIZE = 32
+# 界面尚未显示的块数上限，超过时后台线程等待，避免事件队列堆积导致界面卡顿
+MAX_CHUNKS_IN_FLIGHT = 4
+
+
+class GenerationSignals(QObject):
+    """后台生成任务的信号，由界面线程接收"""
+    # [(密码, 强度 0-100, 熵值), ...]
+    chunk_ready = Signal(object)
+    # 已完成数量, 总数量
+    progress = Signal(int, int)
+    # 是否被取消
+    finished = Signal(bool)
+    error = Signal(str)
+    # 未能写入历史记录的条数, 最近一次失败的原因
+    records_dropped = Signal(int, str)
+
+
+class GenerationWorker(QRunnable):
+    """在 QThreadPool 中生成、评分并记录密码，按块把结果发回界面"""
+
+    def __init__(self,
+                 password_generator: PasswordGenerator,
+                 history_manager,
+                 length: int,
+                 count: int,
+                 policy: Dict[str, bool]):
+        super().__init__()
+        # 由调用方持有引用，避免线程池结束后 Python 对象被提前回收
+        self.setAutoDelete(False)
+        self.signals = GenerationSignals()
+        self.password_generator = password_generator
+        self.history_manager = history_manager
+        self.length = length
+        self.count = count
+        self.policy = policy
+        self._cancelled = threading.Event()
+        self._in_flight = threading.Semaphore(MAX_CHUNKS_IN_FLIGHT)
+        self._done = 0
+
+    def cancel(self):
+        """请求取消，当前块完成后停止"""
+        self._cancelled.set()
+
+    def chunk_consumed(self):
+        """界面显示完一块结果后调用，允许后台线程发送下一块"""
+        self._in_flight.release()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def run(self):
+        cancelled = False
+        try:
+            failed_before = self.history_manager.writer_stats()['failed']
+            passwords = self.password_generator.iter_passwords(
+                self.count,
+                length=self.length,
+                chunk_size=CHUNK_SIZE,
+                with_entropy=True,
+                **self.policy
+            )
+            self._done = 0
+            chunk: List[tuple] = []
+            for password, entropy in passwords:
+                if self._cancelled.is_set():
+                    break
+                # 生成的密码可直接按生成策略评分
+                strength_result = self.password_generator.estimate_strength(
+                    password, generated=True, **self.policy)
+                score = strength_result['score'] * 25  # 转换为0-100的范围
+                chunk.append((password, score, entropy))
+                if len(chunk) >= CHUNK_SIZE:
+                    self._emit_chunk(chunk)
+                    chunk = []
+            if chunk and not self._cancelled.is_set():
+                self._emit_chunk(chunk)
+            cancelled = self._cancelled.is_set()
+            self._flush_history(failed_before)
+        except Exception as e:
+            # 任何异常都要通知界面，否则界面会一直停留在生成中的状态
+            self.signals.error.emit(str(e) or type(e).__name__)
+        finally:
+            self.signals.finished.emit(cancelled)
+
+    def _flush_history(self, failed_before: int):
+        """在工作线程中等待本次的记录写入，界面不需要等待；报告未能写入的条数"""
+        self.history_manager.flush()
+        stats = self.history_manager.writer_stats()
+        dropped = stats['failed'] - failed_before
+        if dropped > 0:
+            self.signals.records_dropped.emit(dropped, stats['last_error'] or '')
+
+    def _emit_chunk(self, chunk: List[tuple]):
+        # 先等界面空出显示槽位；等待中被取消的块既不显示也不记录，
+        # 历史记录中只有用户看到过的密码
+        while not self._in_flight.acquire(timeout=0.1):
+            if self._cancelled.is_set():
+                return
+        # 交给历史记录的后台写入线程，按组提交
+        self.history_manager.queue_records(
+            (password, len(password), score, entropy)
+            for password, score, entropy in chunk
+        )
+        self._done += len(chunk)
+        self.signals.chunk_ready.emit(chunk)
+        self.signals.progress.emit(self._done, self.count)
@@ -0,0 +1,143 @@
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+# 每次从数据库读取的行数
+PAGE_SIZE = 200
+# 最多缓存的页数，其余页只保留起始游标，需要显示时再按游标读取
+MAX_CACHED_PAGES = 16
+# 解密后的密码最多缓存的条数和有效期（秒）；只有显示或复制过的行才会解密
+PASSWORD_CACHE_SIZE = 256
+PASSWORD_CACHE_TTL = 30
+# 无法解密时显示的内容
+UNREADABLE_PASSWORD = "（无法解密）"
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """按需分页加载的历史记录模型
+
+    视图滚动到底部时通过 canFetchMore/fetchMore 追加一页；内存中只保留每页的起始游标
+    和最近访问的少量页面，被淘汰的页面在再次显示时通过键集分页重新读取。
+    加密的记录在页面中保持密文，视图请求显示某一行时才解密，结果短暂缓存。
+    """
+
+    HEADERS = ["密码", "长度", "强度", "熵值", "生成时间"]
+
+    def __init__(self, history_manager, page_size: int = PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.history_manager = history_manager
+        self.page_size = page_size
+        self._reset_state()
+
+    def _reset_state(self):
+        # 第 i 页的起始游标（不含该位置），第 0 页在首次加载时固定
+        self._page_cursors: List[Optional[Tuple[str, int]]] = []
+        self._pages: 'OrderedDict[int, List[Dict]]' = OrderedDict()
+        self._next_cursor: Optional[Tuple[str, int]] = None
+        self._rows = 0
+        self._exhausted = False
+        # 记录 id -> (明文, 过期时间)
+        self._passwords: 'OrderedDict[int, Tuple[Optional[str], float]]' = OrderedDict()
+
+    def refresh(self):
+        """丢弃已加载的数据，从最新的记录重新开始加载"""
+        self.beginResetModel()
+        self._reset_state()
+        self.endResetModel()
+        # 视图在重置后不一定会主动加载，先载入第一页
+        self.fetchMore()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        record = self.record(index.row())
+        column = index.column()
+        if column == 0:
+            password = self.password(index.row())
+            return UNREADABLE_PASSWORD if password is None else password
+        if column == 1:
+            return str(record['length'])
+        if column == 2:
+            return f"{record['strength']}%"
+        if column == 3:
+            return f"{record['entropy']} bits"
+        return record['created_at']
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        cursor = self._next_cursor
+        page = self.history_manager.get_records_before(cursor, self.page_size)
+        if len(page) < self.page_size:
+            self._exhausted = True
+        if not page:
+            return
+        if cursor is None:
+            # 固定第一页的范围，之后新增的记录不会让已加载的页面错位
+            first = self.history_manager.record_cursor(page[0])
+            cursor = (first[0], first[1] + 1)
+
+        self.beginInsertRows(QModelIndex(), self._rows, self._rows + len(page) - 1)
+        self._page_cursors.append(cursor)
+        self._cache_page(len(self._page_cursors) - 1, page)
+        self._rows += len(page)
+        self._next_cursor = self.history_manager.record_cursor(page[-1])
+        self.endInsertRows()
+
+    def record(self, row: int) -> Dict:
+        """获取第 row 行的记录"""
+        page_index, offset = divmod(row, self.page_size)
+        page = self._pages.get(page_index)
+        if page is None:
+            page = self.history_manager.get_records_before(
+                self._page_cursors[page_index], self.page_size)
+            self._cache_page(page_index, page)
+        else:
+            self._pages.move_to_end(page_index)
+        if offset >= len(page):
+            # 记录已在其他地方被删除，刷新前先显示占位内容
+            return {'id': None, 'password': '', 'length': '', 'strength': '',
+                    'entropy': '', 'created_at': ''}
+        return page[offset]
+
+    def password(self, row: int) -> Optional[str]:
+        """第 row 行的密码明文，无法解密时返回 None"""
+        record = self.record(row)
+        stored = record['password']
+        if not isinstance(stored, bytes):
+            return stored
+        now = time.monotonic()
+        cached = self._passwords.get(record['id'])
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        try:
+            password = self.history_manager.decrypt_password(stored)
+        except ValueError:
+            password = None
+        self._passwords[record['id']] = (password, now + PASSWORD_CACHE_TTL)
+        self._passwords.move_to_end(record['id'])
+        while len(self._passwords) > PASSWORD_CACHE_SIZE:
+            self._passwords.popitem(last=False)
+        return password
+
+    def _cache_page(self, page_index: int, page: List[Dict]):
+        self._pages[page_index] = page
+        self._pages.move_to_end(page_index)
+        while len(self._pages) > MAX_CACHED_PAGES:
+            self._pages.popitem(last=False)
@@ -1,28 +1,51 @@
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QSpinBox, QCheckBox,
-    QLineEdit, QProgressBar, QTextEdit, QScrollArea,
+    QLineEdit, QProgressBar, QPlainTextEdit, QScrollArea,
     QFrame, QSlider, QDateTimeEdit, QFileDialog, QMessageBox
 )
-from PySide6.QtCore import Qt, QSize, QDateTime
-from PySide6.QtGui import QColor, QPalette, QClipboard
+from PySide6.QtCore import Qt, QSize, QDateTime, QThreadPool, QTimer
+from PySide6.QtGui import QColor, QPalette, QClipboard, QTextCursor
+import threading
+from typing import TYPE_CHECKING
 from ..models.password_generator import PasswordGenerator
-from ..models.history_manager import HistoryManager
-from ..models.encryption_manager import EncryptionManager
-from PySide6.QtWidgets import QApplication, QTableWidget, QTableWidgetItem, QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QHeaderView
+from .generation_worker import GenerationWorker
+from PySide6.QtWidgets import QApplication, QTableView, QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QHeaderView, QMenu, QAbstractItemView
+from .history_model import HistoryTableModel
+
+if TYPE_CHECKING:
+    from ..models.history_manager import HistoryManager
+    from ..models.encryption_manager import EncryptionManager
+
+# 界面单次允许生成的最大数量
+MAX_GENERATE_COUNT = 100000
+# 生成结果的显示间隔（毫秒）：期间收到的块合并为一次追加和一次重绘
+DISPLAY_INTERVAL_MS = 16
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         
-        # 初始化模型
-        self.password_generator = PasswordGenerator()
-        self.history_manager = HistoryManager()
-        self.encryption_manager = EncryptionManager()
+        # 初始化模型（历史记录和加密管理器在首次使用时创建，见对应属性）
+        # 生成的密码与历史记录中的全部密码比对，重复的会被重新生成
+        self.password_generator = PasswordGenerator(reuse_checker=self._find_reused)
+        self._history_manager = None
+        self._encryption_manager = None
         
         # 当前选中的密码
         self.current_password = ""
         
+        # 正在运行的后台生成任务
+        self._generation_worker = None
+        # 已收到、尚未显示的结果块，由定时器按帧合并显示
+        self._pending_chunks = []
+        self._display_timer = QTimer(self)
+        self._display_timer.setInterval(DISPLAY_INTERVAL_MS)
+        self._display_timer.timeout.connect(self._display_pending_chunks)
+        
+        # 已打开的统计窗口
+        self._statistics_dialog = None
+        
         # 设置窗口属性
         self.setWindowTitle("密码生成器")
         self.setMinimumSize(900, 650)
@@ -89,7 +112,7 @@ class MainWindow(QMainWindow):
                 background-color: #4C84FF;
                 border-radius: 6px;
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: #FFFFFF;
                 color: #2C3E50;
                 border: 1px solid #E1E8ED;
@@ -98,7 +121,7 @@ class MainWindow(QMainWindow):
                 font-size: 13px;
                 line-height: 1.5;
             }
-            QTextEdit:focus {
+            QTextEdit:focus, QPlainTextEdit:focus {
                 border: 2px solid #4C84FF;
             }
         """)
@@ -123,6 +146,43 @@ class MainWindow(QMainWindow):
         main_layout.setStretch(0, 3)  # 左侧占30%
         main_layout.setStretch(1, 7)  # 右侧占70%
     
+    @property
+    def history_manager(self) -> 'HistoryManager':
+        """历史记录管理器，首次访问时才创建数据库连接和表结构
+        
+        生成的记录由后台线程加密并写入，生成速度不受磁盘影响。
+        """
+        if self._history_manager is None:
+            from ..models.history_manager import HistoryManager
+            self._history_manager = HistoryManager(write_behind=True,
+                                                   encryption_manager=self.encryption_manager)
+            # 在后台把加密前写入的旧记录改写为密文，关闭管理器后自动停止
+            threading.Thread(target=self._history_manager.encrypt_existing,
+                             name='history-encrypt', daemon=True).start()
+        return self._history_manager
+    
+    def _find_reused(self, passwords):
+        return self.history_manager.find_reused(passwords)
+    
+    @property
+    def encryption_manager(self) -> 'EncryptionManager':
+        """加密管理器，首次访问时才读取密钥文件"""
+        if self._encryption_manager is None:
+            from ..models.encryption_manager import EncryptionManager
+            self._encryption_manager = EncryptionManager()
+        return self._encryption_manager
+    
+    def closeEvent(self, event):
+        """关闭窗口前停止后台生成，并把排队中的历史记录写入磁盘"""
+        if self._generation_worker is not None:
+            self._generation_worker.cancel()
+        QThreadPool.globalInstance().waitForDone()
+        if self._statistics_dialog is not None:
+            self._statistics_dialog.close()
+        if self._history_manager is not None:
+            self._history_manager.close()
+        super().closeEvent(event)
+    
     def _create_control_panel(self) -> QWidget:
         """创建左侧控制面板"""
         panel = QWidget()
@@ -137,7 +197,7 @@ class MainWindow(QMainWindow):
         # 密码数量设置
         count_label = QLabel("生成数量：")
         self.count_spinbox = QSpinBox()
-        self.count_spinbox.setRange(1, 10)
+        self.count_spinbox.setRange(1, MAX_GENERATE_COUNT)
         self.count_spinbox.setValue(3)
         
         # 字符类型选项
@@ -150,9 +210,17 @@ class MainWindow(QMainWindow):
         self.special_check = QCheckBox("特殊字符")
         self.special_check.setChecked(True)
         
-        # 生成按钮
-        generate_btn = QPushButton("生成密码")
-        generate_btn.clicked.connect(self._generate_passwords)
+        # 生成和取消按钮
+        self.generate_btn = QPushButton("生成密码")
+        self.generate_btn.clicked.connect(self._generate_passwords)
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.clicked.connect(self._cancel_generation)
+        self.cancel_btn.setEnabled(False)
+        
+        # 生成进度
+        self.generation_progress = QProgressBar()
+        self.generation_progress.setRange(0, 100)
+        self.generation_progress.setValue(0)
         
         # 添加到布局
         layout.addWidget(length_label)
@@ -163,7 +231,9 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.lowercase_check)
         layout.addWidget(self.digits_check)
         layout.addWidget(self.special_check)
-        layout.addWidget(generate_btn)
+        layout.addWidget(self.generate_btn)
+        layout.addWidget(self.cancel_btn)
+        layout.addWidget(self.generation_progress)
         layout.addStretch()
         
         return panel
@@ -173,10 +243,10 @@ class MainWindow(QMainWindow):
         display = QWidget()
         layout = QVBoxLayout(display)
         
-        # 密码显示区域
-        self.password_display = QTextEdit()
+        # 密码显示区域（纯文本控件追加大量行时比 QTextEdit 快得多）
+        self.password_display = QPlainTextEdit()
         self.password_display.setReadOnly(True)
-        self.password_display.textChanged.connect(self._on_password_selected)
+        self.password_display.cursorPositionChanged.connect(self._on_password_selected)
         
         # 密码强度进度条
         strength_layout = QHBoxLayout()
@@ -195,9 +265,12 @@ class MainWindow(QMainWindow):
         copy_btn.clicked.connect(self._copy_to_clipboard)
         history_btn = QPushButton("历史记录")
         history_btn.clicked.connect(self._show_history)
+        statistics_btn = QPushButton("统计")
+        statistics_btn.clicked.connect(self._show_statistics)
         
         buttons_layout.addWidget(copy_btn)
         buttons_layout.addWidget(history_btn)
+        buttons_layout.addWidget(statistics_btn)
         
         # 添加到布局
         layout.addWidget(self.password_display)
@@ -214,59 +287,104 @@ class MainWindow(QMainWindow):
             self.current_password = cursor.selectedText()
         else:
             # 尝试获取当前行的密码
-            cursor.select(QTextEdit.LineUnderCursor)
+            cursor.select(QTextCursor.LineUnderCursor)
             line = cursor.selectedText()
             if line.startswith("密码："):
                 self.current_password = line[3:]
     
     def _generate_passwords(self):
-        """生成密码"""
-        try:
-            passwords = self.password_generator.generate_passwords(
-                length=self.length_spinbox.value(),
-                count=self.count_spinbox.value(),
-                use_uppercase=self.uppercase_check.isChecked(),
-                use_lowercase=self.lowercase_check.isChecked(),
-                use_digits=self.digits_check.isChecked(),
-                use_special=self.special_check.isChecked()
-            )
-            
-            # 显示生成的密码
-            self.password_display.clear()
-            for password in passwords:
-                # 检查密码强度
-                strength_result = self.password_generator.check_password_strength(password)
-                score = strength_result['score'] * 25  # 转换为0-100的范围
-                
-                # 计算熵值
-                entropy = self.password_generator.calculate_entropy(password)
-                
-                # 更新显示
-                self.password_display.append(f"密码：{password}")
-                self.password_display.append(f"强度：{score}%")
-                self.password_display.append(f"熵值：{entropy} bits")
-                self.password_display.append("")
-                
-                # 添加到历史记录
-                self.history_manager.add_record(
-                    password=password,
-                    length=len(password),
-                    strength=score,
-                    entropy=entropy
-                )
+        """在后台线程中生成密码，结果按块显示"""
+        if self._generation_worker is not None:
+            return
             
-            # 设置第一个密码为当前密码
-            if passwords:
-                self.current_password = passwords[0]
-                # 更新强度和熵值显示
-                strength_result = self.password_generator.check_password_strength(self.current_password)
-                score = strength_result['score'] * 25
-                self.strength_progress.setValue(int(score))
-                entropy = self.password_generator.calculate_entropy(self.current_password)
-                self.entropy_label.setText(f"密码熵值：{entropy} bits")
-                
-        except ValueError as e:
-            self.password_display.setText(f"错误：{str(e)}")
+        policy = dict(
+            use_uppercase=self.uppercase_check.isChecked(),
+            use_lowercase=self.lowercase_check.isChecked(),
+            use_digits=self.digits_check.isChecked(),
+            use_special=self.special_check.isChecked()
+        )
+        
+        # 历史记录管理器需在界面线程中创建
+        worker = GenerationWorker(
+            self.password_generator,
+            self.history_manager,
+            length=self.length_spinbox.value(),
+            count=self.count_spinbox.value(),
+            policy=policy
+        )
+        worker.signals.chunk_ready.connect(self._on_generation_chunk)
+        worker.signals.progress.connect(self._on_generation_progress)
+        worker.signals.error.connect(self._on_generation_error)
+        worker.signals.records_dropped.connect(self._on_records_dropped)
+        worker.signals.finished.connect(self._on_generation_finished)
+        self._generation_worker = worker
+        
+        self.password_display.clear()
+        self._pending_chunks = []
+        self.current_password = ""
+        self.generation_progress.setValue(0)
+        self.generate_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        QThreadPool.globalInstance().start(worker)
+    
+    def _cancel_generation(self):
+        """取消正在运行的生成任务"""
+        if self._generation_worker is not None:
+            self._generation_worker.cancel()
+            self.cancel_btn.setEnabled(False)
+    
+    def _on_generation_chunk(self, chunk: list):
+        """收到一块生成结果，留到下一帧与其他块一起显示"""
+        self._pending_chunks.append(chunk)
+        if not self._display_timer.isActive():
+            self._display_timer.start()
+    
+    def _display_pending_chunks(self):
+        """显示已收到的全部结果块：每帧只追加一次文本、重绘一次"""
+        chunks = self._pending_chunks
+        if not chunks:
+            self._display_timer.stop()
+            return
+        self._pending_chunks = []
+        lines = []
+        for chunk in chunks:
+            for password, score, entropy in chunk:
+                lines.append(f"密码：{password}")
+                lines.append(f"强度：{score}%")
+                lines.append(f"熵值：{entropy} bits")
+                lines.append("")
+        # 只追加一次，避免逐行触发排版
+        self.password_display.appendPlainText('\n'.join(lines))
+        
+        # 设置第一个密码为当前密码
+        if not self.current_password:
+            password, score, entropy = chunks[0][0]
+            self.current_password = password
+            # 更新强度和熵值显示
+            self.strength_progress.setValue(int(score))
+            self.entropy_label.setText(f"密码熵值：{entropy} bits")
+        
+        if self._generation_worker is not None:
+            for _ in chunks:
+                self._generation_worker.chunk_consumed()
+    
+    def _on_generation_progress(self, done: int, total: int):
+        self.generation_progress.setValue(int(done * 100 / total))
+    
+    def _on_generation_error(self, message: str):
+        self._pending_chunks = []
+        self.password_display.setPlainText(f"错误：{message}")
+    
+    def _on_records_dropped(self, count: int, message: str):
+        QMessageBox.warning(self, "警告", f"有 {count} 个密码未能写入历史记录：{message}")
+    
+    def _on_generation_finished(self, cancelled: bool):
+        # 结束信号在所有结果块之后到达，先显示剩余的块
+        self._display_pending_chunks()
+        self._display_timer.stop()
+        self._generation_worker = None
+        self.generate_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
     
     def _copy_to_clipboard(self):
         """复制密码到剪贴板"""
@@ -313,12 +431,20 @@ class MainWindow(QMainWindow):
         
         layout = QVBoxLayout(dialog)
         
-        # 创建表格
-        table = QTableWidget()
-        table.setColumnCount(5)
-        table.setHorizontalHeaderLabels(["密码", "长度", "强度", "熵值", "生成时间"])
+        # 只显示已写入的记录，不在界面线程中等待后台写入；
+        # 生成任务结束前会在工作线程中等待本次的记录写完
+        # 创建表格，数据随滚动按页加载
+        model = HistoryTableModel(self.history_manager, parent=dialog)
+        table = QTableView()
+        table.setModel(model)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.verticalHeader().setDefaultSectionSize(24)
+        table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         
+        def selected_rows():
+            return sorted({index.row() for index in table.selectionModel().selectedRows()})
+        
         # 设置右键菜单
         table.setContextMenuPolicy(Qt.CustomContextMenu)
         def show_context_menu(pos):
@@ -327,59 +453,50 @@ class MainWindow(QMainWindow):
             delete_action = menu.addAction("删除")
             
             action = menu.exec_(table.mapToGlobal(pos))
+            current_row = table.currentIndex().row()
+            if current_row < 0:
+                return
+            record = model.record(current_row)
             if action == copy_action:
-                current_item = table.item(table.currentRow(), 0)
-                if current_item:
-                    clipboard = QApplication.clipboard()
-                    clipboard.setText(current_item.text())
-                    msg = QMessageBox(dialog)
-                    msg.setIcon(QMessageBox.Information)
-                    msg.setWindowTitle("提示")
-                    msg.setText("密码已复制到剪贴板")
-                    msg.setStandardButtons(QMessageBox.Ok)
-                    msg.button(QMessageBox.Ok).setText("确定")
-                    msg.setStyleSheet("""
-                        QMessageBox {
-                            background-color: #2D2D2D;
-                        }
-                        QMessageBox QLabel {
-                            color: #ECF0F1;
-                            font-size: 14px;
-                        }
-                        QPushButton {
-                            background-color: #3498DB;
-                            color: white;
-                            border: none;
-                            padding: 8px 16px;
-                            border-radius: 4px;
-                            font-size: 14px;
-                            min-width: 80px;
-                        }
-                        QPushButton:hover {
-                            background-color: #2980B9;
-                        }
-                    """)
-                    msg.exec_()
+                password = model.password(current_row)
+                if password is None:
+                    QMessageBox.warning(dialog, "警告", "无法解密该密码")
+                    return
+                clipboard = QApplication.clipboard()
+                clipboard.setText(password)
+                msg = QMessageBox(dialog)
+                msg.setIcon(QMessageBox.Information)
+                msg.setWindowTitle("提示")
+                msg.setText("密码已复制到剪贴板")
+                msg.setStandardButtons(QMessageBox.Ok)
+                msg.button(QMessageBox.Ok).setText("确定")
+                msg.setStyleSheet("""
+                    QMessageBox {
+                        background-color: #2D2D2D;
+                    }
+                    QMessageBox QLabel {
+                        color: #ECF0F1;
+                        font-size: 14px;
+                    }
+                    QPushButton {
+                        background-color: #3498DB;
+                        color: white;
+                        border: none;
+                        padding: 8px 16px;
+                        border-radius: 4px;
+                        font-size: 14px;
+                        min-width: 80px;
+                    }
+                    QPushButton:hover {
+                        background-color: #2980B9;
+                    }
+                """)
+                msg.exec_()
             elif action == delete_action:
-                current_row = table.currentRow()
-                if current_row >= 0:
-                    record_id = records[current_row]['id']
-                    if self.history_manager.delete_record(record_id):
-                        table.removeRow(current_row)
-                        records.pop(current_row)
+                if record['id'] is not None and self.history_manager.delete_record(record['id']):
+                    model.refresh()
         
         table.customContextMenuRequested.connect(show_context_menu)
-        # 获取历史记录
-        records = self.history_manager.get_recent_records(limit=50)
-        table.setRowCount(len(records))
-        
-        # 填充数据
-        for i, record in enumerate(records):
-            table.setItem(i, 0, QTableWidgetItem(record['password']))
-            table.setItem(i, 1, QTableWidgetItem(str(record['length'])))
-            table.setItem(i, 2, QTableWidgetItem(f"{record['strength']}%"))
-            table.setItem(i, 3, QTableWidgetItem(f"{record['entropy']} bits"))
-            table.setItem(i, 4, QTableWidgetItem(record['created_at']))
         
         # 按钮区域
         buttons_layout = QHBoxLayout()
@@ -387,19 +504,16 @@ class MainWindow(QMainWindow):
         clear_btn = QPushButton("清空记录")
         
         def delete_selected():
-            selected_rows = set(item.row() for item in table.selectedItems())
-            for row in sorted(selected_rows, reverse=True):
-                record_id = records[row]['id']
-                if self.history_manager.delete_record(record_id):
-                    table.removeRow(row)
-                    records.pop(row)
+            ids = [model.record(row)['id'] for row in selected_rows()]
+            ids = [record_id for record_id in ids if record_id is not None]
+            if ids and self.history_manager.delete_records(ids):
+                model.refresh()
         
         def clear_all():
             if QMessageBox.question(dialog, "确认", "确定要清空所有历史记录吗？") == QMessageBox.Yes:
-                for record in records:
-                    self.history_manager.delete_record(record['id'])
-                table.setRowCount(0)
-                records.clear()
+                # 清空整张表（不只是已加载的部分），并回收磁盘空间
+                self.history_manager.clear_history(vacuum=True)
+                model.refresh()
         
         delete_btn.clicked.connect(delete_selected)
         clear_btn.clicked.connect(clear_all)
@@ -410,4 +524,18 @@ class MainWindow(QMainWindow):
         layout.addWidget(table)
         layout.addLayout(buttons_layout)
         
-        dialog.exec_()
\ No newline at end of file
+        dialog.exec_()
+    
+    def _show_statistics(self):
+        """显示统计窗口（非模态，生成密码时图表随之更新）"""
+        if self._statistics_dialog is None:
+            # PyQtGraph 只在打开统计窗口时才导入，不影响启动时间
+            from .statistics_view import StatisticsDialog
+            self._statistics_dialog = StatisticsDialog(self.history_manager, self)
+            self._statistics_dialog.finished.connect(self._on_statistics_closed)
+        self._statistics_dialog.show()
+        self._statistics_dialog.raise_()
+    
+    def _on_statistics_closed(self):
+        self._statistics_dialog.deleteLater()
+        self._statistics_dialog = None
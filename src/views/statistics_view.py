@@ -0,0 +1,93 @@
+import calendar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pyqtgraph as pg
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QDialog, QLabel, QVBoxLayout
+
+# 检查历史记录是否有新数据的间隔（毫秒）
+REFRESH_INTERVAL_MS = 1000
+# 历史记录中的强度取值（zxcvbn 评分 0-4 乘以 25）
+STRENGTH_LEVELS = (0, 25, 50, 75, 100)
+DAY_SECONDS = 86400
+
+
+def _day_timestamp(day: str) -> int:
+    """'YYYY-MM-DD'（UTC，与数据库中的生成时间一致）转换为时间戳"""
+    return calendar.timegm(datetime.strptime(day, '%Y-%m-%d').timetuple())
+
+
+class StatisticsDialog(QDialog):
+    """历史记录统计：每日生成数量、强度分布和平均熵值
+
+    数据来自 HistoryManager.daily_statistics 的按天汇总，绘制耗时只与天数有关。
+    窗口打开期间定时检查 data_revision，有新记录写入时自动更新。
+    """
+
+    def __init__(self, history_manager, parent=None):
+        super().__init__(parent)
+        self.history_manager = history_manager
+        self._revision: Optional[Tuple[int, int]] = None
+
+        self.setWindowTitle("统计")
+        self.setMinimumSize(800, 700)
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        # 每日生成数量
+        self.volume_plot = pg.PlotWidget(axisItems={'bottom': pg.DateAxisItem(utcOffset=0)})
+        self.volume_plot.setTitle("每日生成数量")
+        self.volume_bars = pg.BarGraphItem(x=[], height=[], width=DAY_SECONDS * 0.8, brush='#4C84FF')
+        self.volume_plot.addItem(self.volume_bars)
+        layout.addWidget(self.volume_plot)
+
+        # 强度分布
+        self.strength_plot = pg.PlotWidget()
+        self.strength_plot.setTitle("强度分布")
+        self.strength_plot.getAxis('bottom').setTicks([[(level, f"{level}%") for level in STRENGTH_LEVELS]])
+        self.strength_bars = pg.BarGraphItem(x=[], height=[], width=15, brush='#2ECC71')
+        self.strength_plot.addItem(self.strength_bars)
+        layout.addWidget(self.strength_plot)
+
+        # 每日平均熵值
+        self.entropy_plot = pg.PlotWidget(axisItems={'bottom': pg.DateAxisItem(utcOffset=0)})
+        self.entropy_plot.setTitle("每日平均熵值 (bits)")
+        self.entropy_curve = self.entropy_plot.plot([], [], pen='#E67E22', symbol='o', symbolSize=5)
+        layout.addWidget(self.entropy_plot)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start(REFRESH_INTERVAL_MS)
+        self.refresh()
+
+    def refresh(self):
+        """数据有变化时重新读取汇总表并更新图表"""
+        revision = self.history_manager.data_revision()
+        if revision == self._revision:
+            return
+        self._revision = revision
+        self._update_charts(self.history_manager.daily_statistics())
+
+    def _update_charts(self, days: List[Dict]):
+        timestamps = [_day_timestamp(day['day']) for day in days]
+        counts = [day['count'] for day in days]
+        self.volume_bars.setOpts(x=timestamps, height=counts)
+
+        strengths = dict.fromkeys(STRENGTH_LEVELS, 0)
+        for day in days:
+            for strength, count in day['strengths'].items():
+                strengths[strength] = strengths.get(strength, 0) + count
+        self.strength_bars.setOpts(x=list(strengths), height=list(strengths.values()))
+
+        self.entropy_curve.setData(timestamps, [day['mean_entropy'] for day in days])
+
+        total = sum(counts)
+        if total:
+            mean_entropy = sum(day['mean_entropy'] * day['count'] for day in days) / total
+            self.summary_label.setText(
+                f"共 {total} 条记录，{len(days)} 天，平均熵值 {mean_entropy:.1f} bits")
+        else:
+            self.summary_label.setText("暂无历史记录")
@@ -0,0 +1,33 @@
+import math
+
+import pytest
+
+from src.models.encryption_manager import EncryptionManager
+from src.models.kdf import KdfParams
+
+
+def _chi_square(counts, expected):
+    return sum((count - expected) ** 2 / expected for count in counts)
+
+
+@pytest.fixture
+def assert_uniform():
+    """检查各结果的出现次数是否符合均匀分布（卡方检验）
+
+    临界值取自由度 df 的卡方分布均值之上 5 个标准差，分布均匀时误报的概率可以忽略，
+    明显的偏差（如取模偏差）仍会被发现。
+    """
+    def check(counts):
+        counts = list(counts)
+        expected = sum(counts) / len(counts)
+        df = len(counts) - 1
+        statistic = _chi_square(counts, expected)
+        assert statistic < df + 5 * math.sqrt(2 * df), f"卡方统计量 {statistic:.1f}，自由度 {df}"
+    return check
+
+
+@pytest.fixture
+def encryption_manager(tmp_path, monkeypatch):
+    """数据目录位于临时目录中的 EncryptionManager，KDF 使用最低的 PBKDF2 迭代次数以加快测试"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    return EncryptionManager(kdf_params=KdfParams('pbkdf2', 1000))
@@ -0,0 +1,80 @@
+import hashlib
+import os
+
+import pytest
+
+from src.models.breach_checker import BreachChecker, ntlm_hex, sha1_hex
+
+BREACHED = {'password': 3861493, '123456': 37359195, 'letmein': 1}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """约 140 KB 的 SHA-1 语料库，超过 SCAN_LIMIT，查找需要先二分"""
+    lines = {sha1_hex(password): count for password, count in BREACHED.items()}
+    for _ in range(3000):
+        lines[hashlib.sha1(os.urandom(16)).hexdigest().upper().encode()] = 7
+    path = tmp_path / 'pwned-sha1.txt'
+    path.write_bytes(b''.join(b'%s:%d\r\n' % (key, count) for key, count in sorted(lines.items())))
+    return path
+
+
+def _check(checker):
+    for password, count in BREACHED.items():
+        assert checker.breach_count(password) == count
+    assert not checker.is_breached('correct horse battery staple')
+    passwords = ['letmein', 'not-in-corpus', 'password', '123456', 'also-missing']
+    assert checker.breach_counts(passwords) == [1, 0, 3861493, 37359195, 0]
+    assert checker.find_breached(passwords) == [True, False, True, True, False]
+
+
+def test_lookup_without_index(corpus):
+    with BreachChecker(corpus) as checker:
+        assert checker.hash_type == 'sha1'
+        assert checker._index is None
+        _check(checker)
+
+
+def test_lookup_with_prefix_index(corpus):
+    with BreachChecker(corpus) as checker:
+        index_path = checker.build_index(bits=8)
+        _check(checker)
+    # 语料库旁的 .idx 文件在打开时自动加载
+    assert index_path == corpus.with_name(corpus.name + '.idx')
+    with BreachChecker(corpus) as checker:
+        assert checker._index is not None
+        _check(checker)
+
+
+def test_stale_index_is_ignored(corpus):
+    with BreachChecker(corpus) as checker:
+        checker.build_index(bits=4)
+    with open(corpus, 'ab') as f:
+        f.write(b'FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF:2\r\n')
+    with BreachChecker(corpus) as checker:
+        assert checker._index is None
+        _check(checker)
+    with pytest.raises(ValueError):
+        BreachChecker(corpus, index_path=corpus.with_name(corpus.name + '.idx'))
+
+
+def test_ntlm_corpus_without_counts(tmp_path):
+    assert ntlm_hex('password') == b'8846F7EAEE8FB117AD06BDD830B7586C'
+    path = tmp_path / 'pwned-ntlm.txt'
+    path.write_bytes(b'\n'.join(sorted(ntlm_hex(password) for password in BREACHED)) + b'\n')
+    with BreachChecker(path) as checker:
+        assert checker.hash_type == 'ntlm'
+        assert checker.breach_counts(['123456', 'password', 'missing']) == [1, 1, 0]
+
+
+def test_rejects_invalid_corpus(tmp_path):
+    empty = tmp_path / 'empty.txt'
+    empty.write_bytes(b'')
+    with pytest.raises(ValueError):
+        BreachChecker(empty)
+    unknown = tmp_path / 'unknown.txt'
+    unknown.write_bytes(b'ABCDEF:1\n')
+    with pytest.raises(ValueError):
+        BreachChecker(unknown)
+    with pytest.raises(ValueError):
+        BreachChecker(unknown, hash_type='md5')
@@ -0,0 +1,90 @@
+from base64 import b64encode, urlsafe_b64decode
+
+import pytest
+from cryptography.fernet import Fernet
+
+from src.models.codec import VERSION_AESGCM, VERSION_FERNET, CiphertextCodec
+
+
+@pytest.fixture
+def codec():
+    return CiphertextCodec(Fernet.generate_key())
+
+
+def _legacy_forms(codec, data):
+    """旧版本写入的三种密文：二进制 Fernet 令牌、文本令牌、两层 base64 的令牌"""
+    token = codec.fernet.encrypt(data)
+    return [urlsafe_b64decode(token), token, b64encode(token)]
+
+
+def test_round_trip_is_compact(codec):
+    blob = codec.encrypt(b'sixteen-char-pwd')
+    assert CiphertextCodec.is_current(blob)
+    assert len(blob) == 1 + 12 + 16 + 16
+    assert codec.decrypt(blob) == b'sixteen-char-pwd'
+    assert codec.decrypt_text(codec.encrypt_text('密码'.encode())) == '密码'.encode()
+
+
+def test_reads_legacy_formats(codec):
+    for blob in _legacy_forms(codec, b'legacy-password'):
+        assert not CiphertextCodec.is_current(blob)
+        assert codec.decrypt(blob) == b'legacy-password'
+    for text in _legacy_forms(codec, b'legacy-password')[1:]:
+        assert codec.decrypt_text(text.decode()) == b'legacy-password'
+
+
+def test_rejects_foreign_or_damaged_ciphertext(codec):
+    other = CiphertextCodec(Fernet.generate_key())
+    blob = codec.encrypt(b'secret')
+    damaged = blob[:-1] + bytes((blob[-1] ^ 1,))
+    for bad in [other.encrypt(b'secret'), damaged, *_legacy_forms(other, b'secret'), b'', b'\x02abc']:
+        with pytest.raises(ValueError):
+            codec.decrypt(bad)
+    with pytest.raises(ValueError):
+        codec.decrypt_text('not base64!')
+
+
+def test_migrate_rewrites_only_legacy_ciphertext(codec):
+    current = codec.encrypt(b'current')
+    blobs = [current] + _legacy_forms(codec, b'legacy')
+    migrated = list(codec.migrate(blobs))
+    assert migrated[0] is current
+    assert all(CiphertextCodec.is_current(blob) for blob in migrated)
+    assert [codec.decrypt(blob) for blob in migrated] == [b'current'] + [b'legacy'] * 3
+
+    texts = [codec.encrypt_text(b'current')] + [text.decode() for text in _legacy_forms(codec, b'legacy')[1:]]
+    migrated_texts = list(codec.migrate_text(texts))
+    assert migrated_texts[0] == texts[0]
+    assert [codec.decrypt_text(text) for text in migrated_texts] == [b'current', b'legacy', b'legacy']
+    assert all(CiphertextCodec.is_current(urlsafe_b64decode(text)) for text in migrated_texts)
+
+
+def test_encryption_manager_reads_old_password_format(encryption_manager):
+    # 旧版 encrypt_password 在 Fernet 令牌外又做了一次 base64
+    old = b64encode(encryption_manager.fernet.encrypt(b'old-format')).decode()
+    assert encryption_manager.decrypt_password(old) == 'old-format'
+    new = encryption_manager.encrypt_password('new-format')
+    assert len(new) < len(old)
+    assert encryption_manager.decrypt_password(new) == 'new-format'
+
+
+def _record_versions(vault):
+    """各记录密文的第一个字节（格式版本）"""
+    data = vault.path.read_bytes()
+    return {data[vault._offsets[slot]] for slot in vault._names.values()}
+
+
+def test_vault_compact_migrates_legacy_records(encryption_manager, tmp_path, monkeypatch):
+    with encryption_manager.open_vault('master', str(tmp_path / 'secrets.pgv')) as vault:
+        codec = vault._codec
+        # 模拟旧版本写入的记录：二进制 Fernet 令牌
+        with monkeypatch.context() as patch:
+            patch.setattr(codec, 'encrypt', lambda data: urlsafe_b64decode(codec.fernet.encrypt(data)))
+            vault.put_many((f'name-{i}', f'secret-{i}') for i in range(10))
+        vault.put('current', 'current-secret')
+        vault.compact()
+        assert _record_versions(vault) == {VERSION_FERNET, VERSION_AESGCM}
+        vault.compact(migrate=True)
+        assert _record_versions(vault) == {VERSION_AESGCM}
+        assert vault.get('name-9') == 'secret-9'
+        assert vault.get('current') == 'current-secret'
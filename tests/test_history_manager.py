@@ -0,0 +1,176 @@
+import sqlite3
+
+import pytest
+
+from src.models.encryption_manager import EncryptionManager
+from src.models.history_manager import HistoryManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    with HistoryManager(tmp_path / 'history.db') as manager:
+        yield manager
+
+
+def test_connection_is_reused_and_tuned(manager):
+    conn = manager._conn
+    assert manager.add_record('first-password', 14, 3, 60.0)
+    assert manager.add_record('second-password', 15, 4, 70.0)
+    assert manager._conn is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert {record['password'] for record in manager.get_recent_records()} == {
+        'first-password', 'second-password'}
+
+
+def test_failed_commit_rolls_back(manager):
+    # 延迟的外键约束在 COMMIT 时才检查，提交失败后事务必须已经回滚
+    conn = manager._conn
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("CREATE TABLE parent (id INTEGER PRIMARY KEY)")
+    conn.execute("CREATE TABLE child (parent_id INTEGER REFERENCES parent (id) "
+                 "DEFERRABLE INITIALLY DEFERRED)")
+    with pytest.raises(sqlite3.IntegrityError):
+        with manager._transaction() as cursor:
+            cursor.execute("INSERT INTO child VALUES (1)")
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM child").fetchone()[0] == 0
+    assert manager.add_record('after-failure', 13, 3, 55.0)
+
+
+def _records(count, prefix='password'):
+    return [(f'{prefix}-{i:06d}', 16, 4, 80.0) for i in range(count)]
+
+
+def _count(manager):
+    return manager._conn.execute("SELECT COUNT(*) FROM password_history").fetchone()[0]
+
+
+def test_add_records_inserts_in_chunks(manager):
+    records = _records(10) + [('with-expiry', 12, 2, 40.0, '2030-01-01')]
+    assert manager.add_records(iter(records), chunk_size=3) == 11
+    assert _count(manager) == 11
+    row = manager._conn.execute(
+        "SELECT expiry_date FROM password_history WHERE length = 12").fetchone()
+    assert row[0] == '2030-01-01'
+
+
+def test_add_records_is_all_or_nothing(manager):
+    records = _records(5) + [('too-short',)] + _records(5, 'after')
+    assert manager.add_records(records, chunk_size=2) == 0
+    assert _count(manager) == 0
+
+
+def test_add_records_rejects_empty_chunks(manager):
+    with pytest.raises(ValueError):
+        manager.add_records(_records(1), chunk_size=0)
+
+
+def test_queued_records_are_written_in_groups(tmp_path):
+    with HistoryManager(tmp_path / 'history.db', write_behind=True) as manager:
+        assert manager.queue_records(_records(2500)) == 2500
+        assert manager.flush(timeout=10)
+        stats = manager.writer_stats()
+        assert stats['written'] == 2500
+        assert stats['failed'] == 0
+        assert stats['queue_depth'] == 0
+        assert _count(manager) == 2500
+
+
+def test_invalid_queued_records_are_skipped_and_reported(tmp_path):
+    records = _records(3) + [('bad', 'sixteen', 4, 80.0), ('', 16, 4, 80.0)] + _records(3, 'after')
+    with HistoryManager(tmp_path / 'history.db', write_behind=True) as manager:
+        assert manager.queue_records(records) == 6
+        assert manager.flush(timeout=10)
+        stats = manager.writer_stats()
+        assert stats['written'] == 6
+        assert stats['failed'] == 2
+        assert stats['last_error']
+        assert _count(manager) == 6
+
+
+def test_close_drains_the_queue(tmp_path):
+    path = tmp_path / 'history.db'
+    manager = HistoryManager(path, write_behind=True)
+    manager.queue_records(_records(100))
+    manager.close()
+    with HistoryManager(path) as reopened:
+        assert _count(reopened) == 100
+
+
+def _ids(manager):
+    return [row[0] for row in manager._conn.execute("SELECT id FROM password_history ORDER BY id")]
+
+
+def test_delete_records_in_one_statement(manager):
+    manager.add_records(_records(20))
+    ids = _ids(manager)
+    assert manager.delete_records(ids[:5] + [10 ** 9]) == 5
+    assert _ids(manager) == ids[5:]
+    assert manager.delete_records([], vacuum=True) == 0
+    assert manager.delete_records(ids[5:10], vacuum=True) == 5
+    assert _count(manager) == 10
+
+
+def test_clear_history(manager):
+    manager.add_records(_records(50))
+    assert manager.clear_history(vacuum=True)
+    assert _count(manager) == 0
+    assert manager.add_record('after-clear', 11, 2, 50.0)
+
+
+def test_find_reused_includes_deleted_passwords(tmp_path):
+    path = tmp_path / 'history.db'
+    with HistoryManager(path) as manager:
+        manager.add_record('single-password', 15, 3, 70.0)
+        manager.add_records(_records(100))
+        manager.delete_records(_ids(manager)[:50])
+        assert manager.find_reused(['single-password', 'password-000000', 'password-000099',
+                                    'never-generated']) == [True, True, True, False]
+    # 重新打开后从保存的过滤器继续
+    with HistoryManager(path) as manager:
+        assert manager.find_reused(['password-000001', 'never-generated']) == [True, False]
+        manager.add_record('added-later', 11, 2, 50.0)
+        assert manager.find_reused(['added-later']) == [True]
+
+
+def test_encrypted_history_keeps_passwords_out_of_the_file(tmp_path, encryption_manager):
+    path = tmp_path / 'history.db'
+    with HistoryManager(path, encryption_manager=encryption_manager) as manager:
+        manager.add_record('single-secret', 13, 3, 60.0)
+        manager.add_records(_records(100, 'bulk-secret'))
+        stored = [record['password'] for record in manager.get_recent_records(200)]
+        assert all(isinstance(value, bytes) for value in stored)
+        passwords = {manager.decrypt_password(value) for value in stored}
+        assert len(passwords) == 101 and 'single-secret' in passwords
+        assert manager.find_reused(['single-secret', 'bulk-secret-000042', 'other']) == [True, True, False]
+        manager._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    data = path.read_bytes()
+    assert b'single-secret' not in data and b'bulk-secret' not in data
+
+
+def test_encrypting_an_existing_history(tmp_path, encryption_manager):
+    path = tmp_path / 'history.db'
+    with HistoryManager(path) as manager:
+        manager.add_records(_records(30, 'plain'))
+        manager.delete_records(_ids(manager)[:10])
+    with HistoryManager(path, encryption_manager=encryption_manager) as manager:
+        assert manager.encrypt_existing(batch_size=7) == 20
+        stored = [row[0] for row in manager._conn.execute("SELECT password FROM password_history")]
+        assert all(isinstance(value, bytes) for value in stored)
+        assert {manager.decrypt_password(value) for value in stored} == {
+            f'plain-{i:06d}' for i in range(10, 30)}
+        # 启用加密前删除的密码仍然算作已生成过
+        assert manager.find_reused(['plain-000000', 'plain-000029', 'other']) == [True, True, False]
+    with pytest.raises(ValueError):
+        HistoryManager(path)
+
+
+def test_history_of_another_master_key_is_refused(tmp_path, encryption_manager, monkeypatch):
+    path = tmp_path / 'history.db'
+    with HistoryManager(path, encryption_manager=encryption_manager) as manager:
+        manager.add_record('secret', 12, 3, 60.0)
+    other_home = tmp_path / 'other'
+    other_home.mkdir()
+    monkeypatch.setenv('HOME', str(other_home))
+    with pytest.raises(ValueError):
+        HistoryManager(path, encryption_manager=EncryptionManager())
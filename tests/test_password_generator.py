@@ -0,0 +1,52 @@
+import string
+from collections import Counter
+
+import pytest
+
+from src.models.password_generator import PasswordGenerator
+
+SPECIAL = '!@#$%^&*'
+CLASSES = (string.ascii_uppercase, string.ascii_lowercase, string.digits, SPECIAL)
+
+
+def test_generate_batch_has_no_count_cap():
+    passwords = PasswordGenerator().generate_batch(5000, 16)
+    assert len(passwords) == 5000
+    assert all(len(password) == 16 for password in passwords)
+
+
+def test_generate_batch_covers_every_selected_class():
+    allowed = set(''.join(CLASSES))
+    for password in PasswordGenerator().generate_batch(2000, 12):
+        assert set(password) <= allowed
+        for chars in CLASSES:
+            assert not set(chars).isdisjoint(password)
+
+
+def test_generate_batch_skips_unselected_classes():
+    passwords = PasswordGenerator().generate_batch(500, 12, use_uppercase=False, use_special=False)
+    assert set(''.join(passwords)) <= set(string.ascii_lowercase + string.digits)
+
+
+def test_generate_batch_is_uniform_within_each_class(assert_uniform):
+    # 36 个字符时 256 % 36 != 0，被丢弃的字节若处理不当会产生取模偏差
+    text = ''.join(PasswordGenerator().generate_batch(4000, 16, use_uppercase=False, use_special=False))
+    counts = Counter(text)
+    assert_uniform(counts[char] for char in string.ascii_lowercase)
+    assert_uniform(counts[char] for char in string.digits)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'n': 0},
+    {'n': 1, 'length': 11},
+    {'n': 1, 'length': 65},
+    {'n': 1, 'use_uppercase': False, 'use_lowercase': False, 'use_digits': False},
+])
+def test_generate_batch_rejects_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        PasswordGenerator().generate_batch(**kwargs)
+
+
+def test_generate_passwords_keeps_gui_count_limit():
+    with pytest.raises(ValueError):
+        PasswordGenerator().generate_passwords(count=11)
@@ -0,0 +1,82 @@
+import json
+import math
+import string
+from collections import Counter
+
+import pytest
+
+from src.models.password_generator import PasswordGenerator
+from src.models.policy import MIN_TEMPLATE_ENTROPY, PasswordPolicy, load_policies
+
+
+def test_template_positions_and_entropy():
+    policy = PasswordPolicy(template='Aa{3}-9{4}-!{2}')
+    assert policy.length == 12
+    assert policy.entropy == pytest.approx(math.log2(26 ** 4 * 10 ** 4 * 8 ** 2))
+    for password in PasswordGenerator().generate_batch(200, policy=policy):
+        assert password[0] in string.ascii_uppercase
+        assert all(char in string.ascii_lowercase for char in password[1:4])
+        assert password[4] == '-' and password[9] == '-'
+        assert password[5:9].isdigit()
+        assert all(char in '!@#$%^&*' for char in password[10:])
+
+
+def test_template_literals_and_escapes():
+    policy = PasswordPolicy(template='\\A\\{*{8}密')
+    for password in policy.sampler.sample(50):
+        assert password.startswith('A{') and password.endswith('密')
+        assert len(password) == 11
+
+
+def test_template_positions_are_uniform(assert_uniform):
+    policy = PasswordPolicy(template='9*{8}', classes=('digits', 'lowercase'))
+    counts = Counter(password[0] for password in policy.sampler.sample(20000))
+    assert_uniform(counts[digit] for digit in string.digits)
+
+
+@pytest.mark.parametrize('template', ['a', '9{6}', 'Aa9!-Aa9!', 'aaaa', 'a{0}', '{3}', 'a\\', 'a' * 65])
+def test_rejects_weak_or_invalid_templates(template):
+    with pytest.raises(ValueError):
+        PasswordPolicy(template=template)
+
+
+def test_minimum_template_entropy_accepts_documented_examples():
+    for template in ('Aaaa-9999-!!', 'Aa{3}-9{4}-!{2}'):
+        assert PasswordPolicy(template=template).entropy >= MIN_TEMPLATE_ENTROPY
+
+
+def test_exclusions_and_custom_symbols():
+    policy = PasswordPolicy(length=20, symbols='-_', exclude='xyz', exclude_ambiguous=True)
+    text = ''.join(policy.sampler.sample(500))
+    assert not set(text) & set('xyz0Oo1lI|!@#')
+    assert set(text) & set('-_')
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'length': 11},
+    {'classes': ('digits',)},
+    {'classes': ('uppercase', 'emoji')},
+    {'symbols': 'a!'},
+    {'exclude': string.digits},
+    {'min_counts': {'digits': 20}},
+    {'template': 'Aa{8}', 'min_counts': {'uppercase': 1}},
+])
+def test_rejects_invalid_policies(kwargs):
+    with pytest.raises(ValueError):
+        PasswordPolicy(**kwargs)
+
+
+def test_load_policies(tmp_path):
+    path = tmp_path / 'policies.json'
+    path.write_text(json.dumps({
+        'pin-like': {'template': '9{12}'},
+        'wifi': {'length': 24, 'classes': ['lowercase', 'digits'], 'exclude_ambiguous': True},
+    }), encoding='utf-8')
+    policies = load_policies(path)
+    assert policies['pin-like'].length == 12
+    assert policies['wifi'].name == 'wifi'
+    assert policies['wifi'].length == 24
+
+    path.write_text(json.dumps({'bad': {'length': '16'}}), encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_policies(path)
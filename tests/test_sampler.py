@@ -0,0 +1,68 @@
+import math
+from collections import Counter
+from itertools import permutations, product
+
+import pytest
+
+from src.models.sampler import CoverageSampler, random_indices, random_pool
+
+
+def _covering(charsets, min_counts, length):
+    """枚举满足覆盖约束的全部密码"""
+    return [
+        ''.join(chars) for chars in product(''.join(charsets), repeat=length)
+        if all(sum(char in charset for char in chars) >= minimum
+               for charset, minimum in zip(charsets, min_counts))
+    ]
+
+
+@pytest.mark.parametrize('charsets, min_counts, length', [
+    (('ab', '01'), (1, 1), 3),
+    (('abc', '0', '#'), (1, 1, 0), 3),
+    (('ab', 'XYZ'), (2, 0), 4),
+])
+def test_total_matches_enumeration(charsets, min_counts, length):
+    sampler = CoverageSampler(charsets, min_counts, length)
+    assert sampler.total == len(_covering(charsets, min_counts, length))
+    assert sampler.entropy == pytest.approx(math.log2(sampler.total))
+
+
+def test_samples_are_uniform_over_covering_passwords(assert_uniform):
+    charsets, min_counts, length = ('ab', '01'), (1, 1), 3
+    outcomes = _covering(charsets, min_counts, length)
+    counts = Counter(CoverageSampler(charsets, min_counts, length).sample(len(outcomes) * 300))
+    assert set(counts) == set(outcomes)
+    assert_uniform(counts[outcome] for outcome in outcomes)
+
+
+def test_composition_respects_minimums():
+    sampler = CoverageSampler(('abc', '01', '#'), (2, 1, 1), 6)
+    for u in range(0, sampler.total, 97):
+        counts = sampler.composition(u)
+        assert sum(counts) == 6
+        assert all(count >= minimum for count, minimum in zip(counts, (2, 1, 1)))
+
+
+def test_rejects_unsatisfiable_minimums():
+    with pytest.raises(ValueError):
+        CoverageSampler(('ab', '01'), (2, 2), 3)
+
+
+def test_random_indices_are_uniform(assert_uniform):
+    # 256 % 7 != 0
+    counts = Counter(random_indices(7, 70000))
+    assert set(counts) <= set(range(7))
+    assert_uniform(counts[i] for i in range(7))
+
+
+def test_randbelow_and_shuffle_are_uniform(assert_uniform):
+    pool = random_pool()
+    counts = Counter(pool.randbelow(300) for _ in range(60000))
+    assert_uniform(counts[i] for i in range(300))
+
+    shuffled = Counter()
+    for _ in range(24000):
+        items = list('abcd')
+        pool.shuffle(items)
+        shuffled[''.join(items)] += 1
+    assert_uniform(shuffled[''.join(p)] for p in permutations('abcd'))
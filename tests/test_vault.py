@@ -0,0 +1,53 @@
+import pytest
+
+
+def test_put_get_delete_and_reopen(encryption_manager, tmp_path):
+    path = tmp_path / 'secrets.pgv'
+    with encryption_manager.open_vault('master', str(path)) as vault:
+        vault.put('email', 'first-secret')
+        vault.put_many([('bank', '银行密码'), ('wifi', 'wifi-secret')])
+        vault.put('email', 'second-secret')
+        assert vault.delete('wifi')
+        assert not vault.delete('missing')
+        assert vault.get('email') == 'second-secret'
+        assert vault.get('missing') is None
+
+    with encryption_manager.open_vault('master', str(path), create=False) as vault:
+        assert sorted(vault.names()) == ['bank', 'email']
+        assert len(vault) == 2 and 'bank' in vault and 'wifi' not in vault
+        assert vault.get('bank') == '银行密码'
+        assert vault.get('email') == 'second-secret'
+
+
+def test_wrong_master_password(encryption_manager, tmp_path):
+    path = tmp_path / 'secrets.pgv'
+    with encryption_manager.open_vault('master', str(path)) as vault:
+        vault.put('email', 'secret')
+    encryption_manager.clear_key_cache()
+    with pytest.raises(ValueError):
+        encryption_manager.open_vault('wrong', str(path))
+    with pytest.raises(ValueError):
+        encryption_manager.open_vault('master', str(tmp_path / 'missing.pgv'), create=False)
+
+
+def test_compact_reclaims_garbage(encryption_manager, tmp_path):
+    path = tmp_path / 'secrets.pgv'
+    with encryption_manager.open_vault('master', str(path)) as vault:
+        vault.put_many((f'name-{i}', f'secret-{i}') for i in range(200))
+        vault.flush()
+        for i in range(0, 200, 2):
+            vault.delete(f'name-{i}')
+        vault.put('name-1', 'replaced')
+        vault.flush()
+        assert vault.garbage_bytes > 0
+        size = path.stat().st_size
+        vault.compact()
+        assert vault.garbage_bytes == 0
+        assert path.stat().st_size < size
+        assert len(vault) == 100
+        assert vault.get('name-1') == 'replaced'
+        assert vault.get('name-199') == 'secret-199'
+        assert vault.get('name-0') is None
+    with encryption_manager.open_vault('master', str(path)) as vault:
+        assert len(vault) == 100
+        assert vault.get('name-3') == 'secret-3'